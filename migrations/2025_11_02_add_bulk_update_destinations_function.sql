@@ -0,0 +1,62 @@
+-- Bulk partial update for destinations, used by scripts/destination_writer.py
+-- Applies many row updates in one round-trip instead of one .update().eq() call per row.
+--
+-- p_key:  'id' or 'slug' - the column used to find each row
+-- p_rows: JSON array of objects; each object holds the key plus only the columns to change
+--
+-- Every row is applied in its own sub-transaction, so one bad row (unknown column,
+-- type error, constraint violation) is reported back without failing the rest.
+-- Rows whose key matches nothing come back as 'not_found'.
+
+CREATE OR REPLACE FUNCTION bulk_update_destinations(
+  p_key text,
+  p_rows jsonb
+)
+RETURNS TABLE (
+  row_key text,
+  status text,
+  error text
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  r jsonb;
+  set_list text;
+  affected int;
+BEGIN
+  IF p_key NOT IN ('id', 'slug') THEN
+    RAISE EXCEPTION 'bulk_update_destinations: p_key must be id or slug, got %', p_key;
+  END IF;
+
+  FOR r IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    row_key := r->>p_key;
+    error := NULL;
+
+    SELECT string_agg(format('%I = x.%I', k, k), ', ')
+    INTO set_list
+    FROM jsonb_object_keys(r) AS k
+    WHERE k <> p_key;
+
+    IF row_key IS NULL OR set_list IS NULL THEN
+      status := 'skipped';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    BEGIN
+      -- jsonb_populate_record casts each JSON value to the column's own type
+      EXECUTE format(
+        'UPDATE destinations d SET %s FROM jsonb_populate_record(NULL::destinations, $1) x WHERE d.%I = x.%I',
+        set_list, p_key, p_key
+      ) USING r;
+      GET DIAGNOSTICS affected = ROW_COUNT;
+      status := CASE WHEN affected > 0 THEN 'updated' ELSE 'not_found' END;
+    EXCEPTION WHEN others THEN
+      status := 'failed';
+      error := SQLERRM;
+    END;
+
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
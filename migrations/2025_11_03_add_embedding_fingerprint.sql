@@ -0,0 +1,18 @@
+-- Track what each destination embedding was generated from, used by scripts/generate_embeddings.py
+--
+-- embedding_fingerprint = sha256 hex of '<model>\n<search_text>'. The script recomputes it from
+-- the current fields on every run and only re-embeds rows whose fingerprint changed, so edits
+-- from generate_ai_fields.py, fetch_missing_google_data.py or CSV imports are picked up without
+-- wiping every embedding.
+
+ALTER TABLE destinations
+ADD COLUMN IF NOT EXISTS embedding_fingerprint text;
+
+COMMENT ON COLUMN destinations.embedding_fingerprint IS 'sha256 of embedding_model and the search_text the embedding was generated from';
+
+-- No SQL backfill: the update_destination_search_text trigger rewrites search_text with its own
+-- CONCAT_WS/COALESCE format, which is not the text build_search_text() produces, so a hash of the
+-- stored column would never match. The column starts NULL; to keep the existing embeddings instead
+-- of re-embedding the whole catalog, run once:
+--   python scripts/generate_embeddings.py --adopt-existing
+-- which fingerprints rows that already have an embedding from build_search_text() in Python.
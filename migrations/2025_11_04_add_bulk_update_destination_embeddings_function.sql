@@ -0,0 +1,113 @@
+-- Bulk embedding writes in a compact encoding, used by scripts/generate_embeddings.py
+--
+-- The decimal text form of a 768-dim vector ('[0.0123456789,...]') is ~15 KB per row and has to
+-- be parsed and cast server-side. Here each embedding travels as either:
+--   * a base64 string of packed little-endian float32 (768 * 4 bytes -> ~4 KB), or
+--   * a JSON array of numbers (decoded through real[])
+-- and many rows share one call, with the same contract as bulk_update_destinations.
+--
+-- p_key:  'id' or 'slug'
+-- p_rows: JSON array of objects holding the key, 'embedding', and optionally 'search_text',
+--         'embedding_model', 'embedding_fingerprint', 'embedding_updated_at'.
+--         Columns left out of a row keep their current value.
+
+-- Decode base64 packed little-endian float32 into real[]
+CREATE OR REPLACE FUNCTION decode_float32le(p_data text)
+RETURNS real[]
+LANGUAGE sql
+IMMUTABLE STRICT
+AS $$
+  WITH raw AS (
+    SELECT decode(p_data, 'base64') AS b
+  ),
+  words AS (
+    SELECT
+      i,
+      (get_byte(b, i * 4)::bigint
+        | (get_byte(b, i * 4 + 1)::bigint << 8)
+        | (get_byte(b, i * 4 + 2)::bigint << 16)
+        | (get_byte(b, i * 4 + 3)::bigint << 24)) AS u
+    FROM raw, generate_series(0, length(b) / 4 - 1) AS i
+  ),
+  parts AS (
+    SELECT
+      i,
+      CASE WHEN (u >> 31) = 1 THEN -1.0::float8 ELSE 1.0::float8 END AS sign,
+      ((u >> 23) & 255)::int AS exponent,
+      (u & 8388607)::float8 AS mantissa
+    FROM words
+  )
+  SELECT array_agg(
+    CASE
+      -- Subnormals and zero
+      WHEN exponent = 0 THEN sign * mantissa * power(2::float8, -149)
+      -- Inf / NaN never occur in embeddings; NULL makes the vector cast fail loudly
+      WHEN exponent = 255 THEN NULL
+      ELSE sign * (1 + mantissa / 8388608) * power(2::float8, exponent - 127)
+    END::real
+    ORDER BY i
+  )
+  FROM parts
+$$;
+
+CREATE OR REPLACE FUNCTION bulk_update_destination_embeddings(
+  p_key text,
+  p_rows jsonb
+)
+RETURNS TABLE (
+  row_key text,
+  status text,
+  error text
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  r jsonb;
+  new_embedding vector;
+  affected int;
+BEGIN
+  IF p_key NOT IN ('id', 'slug') THEN
+    RAISE EXCEPTION 'bulk_update_destination_embeddings: p_key must be id or slug, got %', p_key;
+  END IF;
+
+  FOR r IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    row_key := r->>p_key;
+    error := NULL;
+
+    IF row_key IS NULL OR NOT r ? 'embedding' THEN
+      status := 'skipped';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    BEGIN
+      new_embedding := CASE jsonb_typeof(r->'embedding')
+        WHEN 'array' THEN
+          (SELECT array_agg(x::real ORDER BY n) FROM jsonb_array_elements_text(r->'embedding') WITH ORDINALITY AS e(x, n))::vector
+        ELSE
+          decode_float32le(r->>'embedding')::vector
+      END;
+
+      -- Only the key goes through jsonb_populate_record, so it is compared with its own column type
+      EXECUTE format(
+        'UPDATE destinations d SET
+           embedding = $2,
+           search_text = CASE WHEN $1 ? ''search_text'' THEN $1->>''search_text'' ELSE d.search_text END,
+           embedding_model = CASE WHEN $1 ? ''embedding_model'' THEN $1->>''embedding_model'' ELSE d.embedding_model END,
+           embedding_fingerprint = CASE WHEN $1 ? ''embedding_fingerprint'' THEN $1->>''embedding_fingerprint'' ELSE d.embedding_fingerprint END,
+           embedding_updated_at = CASE WHEN $1 ? ''embedding_updated_at'' THEN ($1->>''embedding_updated_at'')::timestamptz ELSE d.embedding_updated_at END
+         FROM jsonb_populate_record(NULL::destinations, $3) x
+         WHERE d.%I = x.%I',
+        p_key, p_key
+      ) USING r, new_embedding, jsonb_build_object(p_key, r->p_key);
+      GET DIAGNOSTICS affected = ROW_COUNT;
+      status := CASE WHEN affected > 0 THEN 'updated' ELSE 'not_found' END;
+    EXCEPTION WHEN others THEN
+      status := 'failed';
+      error := SQLERRM;
+    END;
+
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
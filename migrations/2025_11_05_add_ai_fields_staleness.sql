@@ -0,0 +1,53 @@
+-- Server-side selection of destinations whose AI fields need (re)generating,
+-- used by scripts/generate_ai_fields.py
+--
+-- ai_inputs_fingerprint  generated: md5 of the prompt inputs (name, city, category, description,
+--                        content, michelin_stars); Postgres keeps it current on every write
+-- ai_fields_fingerprint  the ai_inputs_fingerprint the stored AI fields were generated from,
+--                        written by the script together with the fields
+--
+-- destinations_ai_fields_pending lists rows never generated or whose inputs changed since,
+-- so the script only fetches (and sends to Gemini) new or changed destinations.
+
+ALTER TABLE destinations
+ADD COLUMN IF NOT EXISTS ai_inputs_fingerprint text GENERATED ALWAYS AS (
+  md5(
+    COALESCE(name, '') || E'\x1f' ||
+    COALESCE(city, '') || E'\x1f' ||
+    COALESCE(category, '') || E'\x1f' ||
+    COALESCE(description, '') || E'\x1f' ||
+    COALESCE(content, '') || E'\x1f' ||
+    COALESCE(michelin_stars::text, '')
+  )
+) STORED;
+
+ALTER TABLE destinations
+ADD COLUMN IF NOT EXISTS ai_fields_fingerprint text;
+
+COMMENT ON COLUMN destinations.ai_inputs_fingerprint IS 'md5 of the inputs generate_ai_fields.py builds its prompt from';
+COMMENT ON COLUMN destinations.ai_fields_fingerprint IS 'ai_inputs_fingerprint at the time the AI fields were generated';
+
+-- Fields generated before this migration are assumed to match the current inputs;
+-- only rows edited from here on are regenerated
+UPDATE destinations
+SET ai_fields_fingerprint = ai_inputs_fingerprint
+WHERE ai_fields_generated_at IS NOT NULL
+  AND ai_fields_fingerprint IS NULL
+  AND (vibe_tags IS NOT NULL OR keywords IS NOT NULL OR short_summary IS NOT NULL);
+
+CREATE OR REPLACE VIEW destinations_ai_fields_pending AS
+SELECT
+  id,
+  slug,
+  name,
+  city,
+  category,
+  description,
+  content,
+  michelin_stars,
+  ai_inputs_fingerprint
+FROM destinations
+WHERE ai_fields_generated_at IS NULL
+   OR ai_fields_fingerprint IS DISTINCT FROM ai_inputs_fingerprint;
+
+COMMENT ON VIEW destinations_ai_fields_pending IS 'Destinations whose AI fields are missing or were generated from different inputs';
@@ -0,0 +1,124 @@
+-- Bulk duplicate merge for destinations, used by scripts/merge_duplicates.py
+-- Same (p_key, p_rows) -> (row_key, status, error) contract as bulk_update_destinations,
+-- so scripts/destination_writer.py sends it with rpc='bulk_merge_destinations'.
+--
+-- p_key:  must be 'id'
+-- p_rows: JSON array of objects, one per merge cluster:
+--           id         - the destination to keep
+--           merge_ids  - JSON array of duplicate destination ids to fold into it
+--           any other  - merged column values to set on the kept row
+--
+-- For each object, in its own sub-transaction (one bad cluster never fails the rest):
+--   1. the kept row is updated with the merged columns
+--   2. rows that reference a duplicate are re-pointed at the kept row:
+--        saved_places, visited_places, list_items, reviews  (by destination_slug)
+--        list_destinations                                  (by destination_id)
+--      Where the kept row is already referenced in the same scope (same user for
+--      saved/visited/reviews, same list for list items), the duplicate's reference
+--      is dropped instead, since the UNIQUE constraints allow only one.
+--   3. the duplicates are deleted
+-- Reference tables that do not exist in this database are skipped.
+-- A kept id that matches nothing comes back as 'not_found'; duplicate ids that no
+-- longer exist (merged by an earlier run) are ignored.
+
+CREATE OR REPLACE FUNCTION bulk_merge_destinations(
+  p_key text,
+  p_rows jsonb
+)
+RETURNS TABLE (
+  row_key text,
+  status text,
+  error text
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  r jsonb;
+  set_list text;
+  keep_id int;
+  keep_slug text;
+  dup record;
+  ref record;
+BEGIN
+  IF p_key IS DISTINCT FROM 'id' THEN
+    RAISE EXCEPTION 'bulk_merge_destinations: p_key must be id, got %', p_key;
+  END IF;
+
+  FOR r IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    row_key := r->>'id';
+    error := NULL;
+
+    IF row_key IS NULL OR jsonb_typeof(r->'merge_ids') IS DISTINCT FROM 'array' THEN
+      status := 'skipped';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    BEGIN
+      keep_id := row_key::int;
+      SELECT d.slug INTO keep_slug FROM destinations d WHERE d.id = keep_id FOR UPDATE;
+
+      IF NOT FOUND THEN
+        status := 'not_found';
+      ELSE
+        SELECT string_agg(format('%I = x.%I', k, k), ', ')
+        INTO set_list
+        FROM jsonb_object_keys(r) AS k
+        WHERE k NOT IN ('id', 'slug', 'merge_ids');
+
+        IF set_list IS NOT NULL THEN
+          -- jsonb_populate_record casts each JSON value to the column's own type
+          EXECUTE format(
+            'UPDATE destinations d SET %s FROM jsonb_populate_record(NULL::destinations, $1) x WHERE d.id = $2',
+            set_list
+          ) USING r, keep_id;
+        END IF;
+
+        FOR dup IN
+          SELECT d.id, d.slug
+          FROM destinations d
+          WHERE d.id IN (SELECT value::int FROM jsonb_array_elements_text(r->'merge_ids'))
+            AND d.id <> keep_id
+          FOR UPDATE
+        LOOP
+          FOR ref IN
+            SELECT *
+            FROM (VALUES
+              ('saved_places',      'destination_slug', 'user_id'),
+              ('visited_places',    'destination_slug', 'user_id'),
+              ('list_items',        'destination_slug', 'list_id'),
+              ('reviews',           'destination_slug', 'user_id'),
+              ('list_destinations', 'destination_id',   'list_id')
+            ) AS t(tbl, col, scope)
+            WHERE to_regclass(format('public.%I', t.tbl)) IS NOT NULL
+          LOOP
+            -- Literals (%L) let Postgres type them as the column, so its index is used
+            EXECUTE format(
+              'DELETE FROM public.%1$I x WHERE x.%2$I = %4$L AND EXISTS ('
+              '  SELECT 1 FROM public.%1$I y WHERE y.%2$I = %5$L AND y.%3$I = x.%3$I)',
+              ref.tbl, ref.col, ref.scope,
+              CASE WHEN ref.col = 'destination_id' THEN dup.id::text ELSE dup.slug END,
+              CASE WHEN ref.col = 'destination_id' THEN keep_id::text ELSE keep_slug END
+            );
+            EXECUTE format(
+              'UPDATE public.%1$I SET %2$I = %4$L WHERE %2$I = %3$L',
+              ref.tbl, ref.col,
+              CASE WHEN ref.col = 'destination_id' THEN dup.id::text ELSE dup.slug END,
+              CASE WHEN ref.col = 'destination_id' THEN keep_id::text ELSE keep_slug END
+            );
+          END LOOP;
+
+          DELETE FROM destinations d WHERE d.id = dup.id;
+        END LOOP;
+
+        status := 'updated';
+      END IF;
+    EXCEPTION WHEN others THEN
+      status := 'failed';
+      error := SQLERRM;
+    END;
+
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
@@ -0,0 +1,43 @@
+-- Link destinations to the normalized cities/categories tables
+-- (migrations/001_create_normalized_tables.sql), filled by scripts/002_populate_normalized_tables.py
+--
+-- destinations.city / destinations.category stay the source of truth for now; the new
+-- keys are derived from them:
+--   city_id     -> cities.id      where cities.slug = destinations.city
+--   category_id -> categories.id  where categories.name = destinations.category
+
+ALTER TABLE destinations
+  ADD COLUMN IF NOT EXISTS city_id UUID REFERENCES public.cities(id) ON DELETE SET NULL,
+  ADD COLUMN IF NOT EXISTS category_id UUID REFERENCES public.categories(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS destinations_city_id_idx ON destinations(city_id);
+CREATE INDEX IF NOT EXISTS destinations_category_id_idx ON destinations(category_id);
+
+-- Set city_id / category_id on every destination in two set-based UPDATEs.
+-- Only rows whose key is missing or stale are written, so re-running is cheap.
+-- Returns the number of rows changed for each key.
+CREATE OR REPLACE FUNCTION backfill_destination_taxonomy_keys()
+RETURNS TABLE (
+  cities_linked int,
+  categories_linked int
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE destinations d
+  SET city_id = c.id
+  FROM cities c
+  WHERE c.slug = d.city
+    AND d.city_id IS DISTINCT FROM c.id;
+  GET DIAGNOSTICS cities_linked = ROW_COUNT;
+
+  UPDATE destinations d
+  SET category_id = c.id
+  FROM categories c
+  WHERE c.name = d.category
+    AND d.category_id IS DISTINCT FROM c.id;
+  GET DIAGNOSTICS categories_linked = ROW_COUNT;
+
+  RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,53 @@
+-- Data coverage of destinations in one query, used by scripts/data_coverage.py
+-- (fetch_missing_google_data.py, verify_migration.py)
+--
+-- p_columns: destination columns to measure. Names that are not columns of
+--            destinations are ignored, so the list can never inject SQL.
+--            At most 50 columns (jsonb_build_object takes 100 arguments).
+--
+-- Returns one row per group of a single GROUPING SETS scan:
+--   dimension 'all'      value NULL       - the whole table
+--   dimension 'city'     value = city     - one row per city (NULL city included)
+--   dimension 'category' value = category - one row per category
+-- with total = rows in the group and filled = {column: non-null count}.
+
+CREATE OR REPLACE FUNCTION destination_coverage(p_columns text[])
+RETURNS TABLE (
+  dimension text,
+  value text,
+  total bigint,
+  filled jsonb
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  counts text;
+BEGIN
+  SELECT string_agg(format('%L, count(%I)', a.attname, a.attname), ', ' ORDER BY c.pos)
+  INTO counts
+  FROM unnest(p_columns) WITH ORDINALITY AS c(name, pos)
+  JOIN pg_attribute a
+    ON a.attrelid = 'public.destinations'::regclass
+   AND a.attname = c.name
+   AND a.attnum > 0
+   AND NOT a.attisdropped;
+
+  IF counts IS NULL THEN
+    counts := '';
+  END IF;
+
+  RETURN QUERY EXECUTE format(
+    'SELECT CASE WHEN GROUPING(city) = 0 THEN ''city''
+                 WHEN GROUPING(category) = 0 THEN ''category''
+                 ELSE ''all'' END,
+            CASE WHEN GROUPING(city) = 0 THEN city::text
+                 WHEN GROUPING(category) = 0 THEN category::text END,
+            count(*),
+            jsonb_build_object(%s)
+     FROM destinations
+     GROUP BY GROUPING SETS ((), (city), (category))',
+    counts
+  );
+END;
+$$;
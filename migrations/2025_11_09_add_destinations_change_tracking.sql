@@ -0,0 +1,71 @@
+-- Change tracking for destinations, used by scripts/catalog_snapshot.py
+-- to pull only rows changed since its last sync.
+--
+-- updated_at:             now() on insert, and moved by a trigger on every UPDATE, so bulk
+--                         RPCs, the app and ad-hoc SQL all bump it. Existing rows start at
+--                         the epoch: they are all covered by the snapshot's first full read,
+--                         and a shared migration timestamp would keep them inside the sync's
+--                         overlap window.
+-- destination_deletions:  one row per deleted destination (written by a trigger), so
+--                         deletes can be replayed too; an updated_at watermark can't see them.
+--                         Only the service role (the sync script) can read it; the trigger
+--                         writes it as the function owner, so deletes by other roles still work.
+
+ALTER TABLE destinations
+  ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT 'epoch';
+ALTER TABLE destinations
+  ALTER COLUMN updated_at SET DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS destinations_updated_at_idx ON destinations(updated_at);
+
+CREATE OR REPLACE FUNCTION set_destinations_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS destinations_set_updated_at ON destinations;
+CREATE TRIGGER destinations_set_updated_at
+  BEFORE UPDATE ON destinations
+  FOR EACH ROW
+  EXECUTE FUNCTION set_destinations_updated_at();
+
+CREATE TABLE IF NOT EXISTS destination_deletions (
+  id bigserial PRIMARY KEY,
+  destination_id integer NOT NULL,
+  deleted_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS destination_deletions_deleted_at_idx ON destination_deletions(deleted_at);
+
+-- Enable Row Level Security
+ALTER TABLE destination_deletions ENABLE ROW LEVEL SECURITY;
+REVOKE ALL ON destination_deletions FROM anon, authenticated;
+REVOKE ALL ON SEQUENCE destination_deletions_id_seq FROM anon, authenticated;
+GRANT SELECT, INSERT, DELETE ON destination_deletions TO service_role;
+
+DROP POLICY IF EXISTS "Service role manages destination deletions" ON destination_deletions;
+CREATE POLICY "Service role manages destination deletions" ON destination_deletions
+  FOR ALL TO service_role USING (true) WITH CHECK (true);
+
+CREATE OR REPLACE FUNCTION record_destination_deletion()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO destination_deletions (destination_id) VALUES (OLD.id);
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS destinations_record_deletion ON destinations;
+CREATE TRIGGER destinations_record_deletion
+  AFTER DELETE ON destinations
+  FOR EACH ROW
+  EXECUTE FUNCTION record_destination_deletion();
@@ -2,114 +2,132 @@
 """
 Populate normalized tables with data from existing destinations table.
 This script is safe to run multiple times - it will skip existing records.
+
+Set-based, so a large catalog takes a handful of calls:
+1. Stream destinations once and collect the distinct cities and categories
+2. Read the existing cities/categories once and keep only the missing ones
+3. Bulk upsert the missing rows (ON CONFLICT slug DO NOTHING)
+4. Link destinations.city_id / category_id with one backfill RPC
+   (migrations/2025_11_07_add_destination_city_category_keys.sql)
 """
 
-from supabase import create_client
-from collections import defaultdict
-from dotenv import load_dotenv
-import os
+import argparse
 import sys
-
-# Load environment variables
-load_dotenv('.env.local')
-
-# Supabase credentials
-url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-
-if not url or not key:
-    print("❌ Error: Supabase credentials not found in .env.local")
-    sys.exit(1)
-
-supabase = create_client(url, key)
+from collections import Counter, defaultdict
+from clients import get_supabase
+from destination_reader import iter_destinations_parallel, iter_rows
+from destination_writer import BulkWriter
 
 def slugify(text):
     """Convert text to URL-friendly slug"""
     return text.lower().replace(' ', '-').replace('&', 'and')
 
-print("="*60)
-print("POPULATING NORMALIZED TABLES")
-print("="*60)
-
-# Step 1: Get all destinations
-print("\n📊 Fetching destinations...")
-try:
-    response = supabase.table('destinations').select('city, country, category').execute()
-    destinations = response.data
-    print(f"✓ Found {len(destinations)} destinations")
-except Exception as e:
-    print(f"✗ Error fetching destinations: {e}")
-    sys.exit(1)
-
-# Step 2: Extract unique cities
-print("\n🌍 Processing cities...")
-cities_data = {}
-for dest in destinations:
-    city = dest.get('city')
-    country = dest.get('country')
-    if city and country:
-        key = (city, country)
-        if key not in cities_data:
-            cities_data[key] = {
-                'name': city.replace('-', ' ').title(),
-                'slug': city,
-                'country': country
-            }
-
-print(f"  Found {len(cities_data)} unique cities")
-
-# Insert cities
-cities_created = 0
-for city_data in cities_data.values():
+def report_failure(row, error):
+    print(f"  ✗ Error creating {row.get('name')}: {error}")
+
+def upsert_missing(supabase, table, rows):
+    """Insert rows in bulk; rows whose slug appeared meanwhile are left untouched"""
+    writer = BulkWriter(
+        supabase, table, key='slug', mode='upsert', ignore_duplicates=True,
+        on_failure=report_failure,
+    )
+    with writer:
+        for row in rows:
+            writer.add(row)
+    return writer.updated, writer.batches
+
+def main():
+    argparse.ArgumentParser(description="Populate the cities and categories tables from destinations").parse_args()
+
+    supabase = get_supabase()
+
+    print("="*60)
+    print("POPULATING NORMALIZED TABLES")
+    print("="*60)
+
+    # Step 1: Collect distinct cities and categories in one streamed pass
+    print("\n📊 Fetching destinations...")
+    city_countries = defaultdict(Counter)
+    category_names = set()
+    destination_count = 0
     try:
-        supabase.table('cities').insert(city_data).execute()
-        cities_created += 1
-        print(f"  ✓ Created: {city_data['name']}, {city_data['country']}")
+        for dest in iter_destinations_parallel(supabase, 'city, country, category'):
+            destination_count += 1
+            if dest.get('city') and dest.get('country'):
+                city_countries[dest['city']][dest['country']] += 1
+            if dest.get('category'):
+                category_names.add(dest['category'])
+        print(f"✓ Found {destination_count} destinations")
     except Exception as e:
-        if 'duplicate' in str(e).lower() or 'unique' in str(e).lower():
-            print(f"  ℹ Skipped (exists): {city_data['name']}")
-        else:
-            print(f"  ✗ Error creating {city_data['name']}: {e}")
-
-print(f"\n✓ Cities: {cities_created} created")
-
-# Step 3: Extract unique categories
-print("\n📂 Processing categories...")
-categories_data = {}
-for dest in destinations:
-    category = dest.get('category')
-    if category:
-        if category not in categories_data:
-            categories_data[category] = {
-                'name': category,
-                'slug': slugify(category)
-            }
-
-print(f"  Found {len(categories_data)} unique categories")
-
-# Insert categories
-categories_created = 0
-for cat_data in categories_data.values():
+        print(f"✗ Error fetching destinations: {e}")
+        sys.exit(1)
+
+    # Step 2: Diff cities against the table
+    print("\n🌍 Processing cities...")
+    # cities.slug is unique, so a city spelled the same in two countries is one
+    # row; it gets the country most of its destinations use
+    cities_data = {
+        city: {
+            'name': city.replace('-', ' ').title(),
+            'slug': city,
+            'country': countries.most_common(1)[0][0],
+        }
+        for city, countries in city_countries.items()
+    }
+    print(f"  Found {len(cities_data)} unique cities")
+
+    existing_city_slugs = {row['slug'] for row in iter_rows(supabase, 'cities', 'slug')}
+    new_cities = [row for slug, row in sorted(cities_data.items()) if slug not in existing_city_slugs]
+    print(f"  ℹ {len(cities_data) - len(new_cities)} already exist, {len(new_cities)} to create")
+
+    cities_created, city_requests = upsert_missing(supabase, 'cities', new_cities)
+    print(f"\n✓ Cities: {cities_created} created in {city_requests} requests")
+
+    # Step 3: Diff categories against the table
+    print("\n📂 Processing categories...")
+    categories_data = {
+        category: {'name': category, 'slug': slugify(category)}
+        for category in sorted(category_names)
+    }
+    print(f"  Found {len(categories_data)} unique categories")
+
+    existing_categories = list(iter_rows(supabase, 'categories', 'name, slug'))
+    existing_names = {row['name'] for row in existing_categories}
+    existing_slugs = {row['slug'] for row in existing_categories}
+    # Both name and slug are unique; either one existing means the category does
+    new_categories = [
+        row for row in categories_data.values()
+        if row['name'] not in existing_names and row['slug'] not in existing_slugs
+    ]
+    print(f"  ℹ {len(categories_data) - len(new_categories)} already exist, {len(new_categories)} to create")
+
+    categories_created, category_requests = upsert_missing(supabase, 'categories', new_categories)
+    print(f"\n✓ Categories: {categories_created} created in {category_requests} requests")
+
+    # Step 4: Link destinations to their city and category rows
+    print("\n🔗 Linking destinations to cities and categories...")
     try:
-        supabase.table('categories').insert(cat_data).execute()
-        categories_created += 1
-        print(f"  ✓ Created: {cat_data['name']}")
+        linked = supabase.rpc('backfill_destination_taxonomy_keys', {}).execute().data[0]
+        print(f"✓ city_id set on {linked['cities_linked']} destinations")
+        print(f"✓ category_id set on {linked['categories_linked']} destinations")
     except Exception as e:
-        if 'duplicate' in str(e).lower() or 'unique' in str(e).lower():
-            print(f"  ℹ Skipped (exists): {cat_data['name']}")
-        else:
-            print(f"  ✗ Error creating {cat_data['name']}: {e}")
-
-print(f"\n✓ Categories: {categories_created} created")
-
-# Summary
-print("\n" + "="*60)
-print("MIGRATION COMPLETE!")
-print("="*60)
-print(f"\nSummary:")
-print(f"  Cities created:     {cities_created}")
-print(f"  Categories created: {categories_created}")
-print(f"\n✅ Your new tables are ready to use!")
-print(f"✅ Your existing destinations table is unchanged")
-print(f"\nNext step: Run verify_migration.py to check everything")
-
+        linked = None
+        print(f"✗ Error linking destinations: {e}")
+        print("  Run migrations/2025_11_07_add_destination_city_category_keys.sql first")
+
+    # Summary
+    print("\n" + "="*60)
+    print("MIGRATION COMPLETE!")
+    print("="*60)
+    print(f"\nSummary:")
+    print(f"  Cities created:     {cities_created}")
+    print(f"  Categories created: {categories_created}")
+    if linked:
+        print(f"  Destinations linked: {linked['cities_linked']} cities, {linked['categories_linked']} categories")
+    print(f"\n✅ Your new tables are ready to use!")
+    print(f"✅ Destinations keep their city/category text; city_id and category_id are derived from it")
+    print(f"\nNext step: Run verify_migration.py to check everything")
+
+
+if __name__ == '__main__':
+    main()
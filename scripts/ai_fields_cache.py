@@ -0,0 +1,131 @@
+"""
+Content-addressed on-disk cache for Gemini AI field outputs.
+
+Generated vibe_tags / keywords / short_summary / search_keywords used to live
+only in the destination row, so re-running generate_ai_fields.py (or fixing
+just its write step) paid for every Gemini call again. Outputs are kept in a
+local SQLite file keyed by a hash of the model name, the prompt template
+version and the destination's prompt inputs: identical inputs map to the same
+key and are never generated twice, while any change to the inputs, the
+prompt or the model misses and regenerates. Entries never go stale by
+themselves; the least recently used ones are evicted once the cache grows
+past max_bytes.
+
+SQLite runs in WAL mode, and one connection is shared by worker threads
+behind a lock.
+
+Usage:
+    cache = AiFieldsCache()
+    key = cache_key(MODEL_NAME, PROMPT_TEMPLATE_VERSION, prompt_inputs(dest))
+    fields = cache.get(key)
+    if fields is None:
+        fields = generate(...)
+        cache.put(key, fields)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.environ.get(
+    'AI_FIELDS_CACHE_PATH', os.path.join(REPO_ROOT, '.cache', 'ai_fields.sqlite')
+)
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_fields (
+    key         TEXT PRIMARY KEY,
+    output      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_fields_last_access ON ai_fields(last_access);
+"""
+
+
+def cache_key(model: str, template_version: str, inputs: Dict) -> str:
+    """sha256 over the model, prompt template version and canonical JSON of the inputs"""
+    canonical = json.dumps(
+        {'model': model, 'template': template_version, 'inputs': inputs},
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class AiFieldsCache:
+    """SQLite-backed, content-addressed store of generated AI fields with LRU eviction"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        # Running upper bound on the cache size, so puts don't SUM() every time
+        self._approx_size = self.size_bytes()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached output for key, or None on a miss"""
+        with self._lock:
+            row = self._db.execute('SELECT output FROM ai_fields WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute(
+                    'UPDATE ai_fields SET last_access = ? WHERE key = ?', (time.time(), key)
+                )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, output: Dict):
+        now = time.time()
+        payload = json.dumps(output, separators=(',', ':'))
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO ai_fields (key, output, size, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, payload, len(payload), now, now),
+                )
+            self._approx_size += len(payload)
+            self._evict()
+
+    def size_bytes(self) -> int:
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM ai_fields').fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used entries down to 90% of max_bytes"""
+        if self._approx_size <= self.max_bytes:
+            return
+        total = self._approx_size = self.size_bytes()
+        target = int(self.max_bytes * 0.9)
+        if total <= self.max_bytes:
+            return
+
+        doomed = []
+        for key, size in self._db.execute('SELECT key, size FROM ai_fields ORDER BY last_access'):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        with self._db:
+            self._db.executemany('DELETE FROM ai_fields WHERE key = ?', doomed)
+        self._approx_size = total
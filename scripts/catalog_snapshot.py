@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Versioned local columnar snapshot of the destinations table.
+
+Read-heavy jobs (duplicate scans, coverage, exports) otherwise pull the whole
+table over HTTP on every run. `sync_snapshot()` keeps a copy on disk as an
+Arrow IPC file, which is uncompressed and column-oriented, so it is opened
+with mmap instead of parsed:
+
+    destinations-v<N>.arrow   every column except the embedding, sorted by id
+    meta.json                 version, file, count, watermarks, JSON columns
+
+The first sync reads the full table. Later syncs only pull rows whose
+updated_at is at or after the last watermark, plus the ids in
+destination_deletions since then (both maintained by triggers,
+migrations/2025_11_09_add_destinations_change_tracking.sql). The watermark
+is rewound by SYNC_OVERLAP, so rows from transactions that committed late
+with an earlier now() are not missed; rows fetched twice just replace
+themselves.
+
+Each sync writes version N+1 next to version N and then swaps meta.json, so
+a reader never sees a half-written snapshot, and a process that already has
+version N mapped keeps reading it.
+
+Object-valued columns (opening_hours_json, reviews_json, ...) are stored as
+JSON text and decoded again by `rows()`, which yields the same dicts as
+iter_destinations() does.
+
+Usage:
+    python catalog_snapshot.py sync [--full]
+    python catalog_snapshot.py info
+
+    snapshot = CatalogSnapshot.open()
+    for dest in snapshot.rows('id, name, city'):
+        ...
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from clients import get_supabase
+from destination_reader import iter_destinations, iter_destinations_parallel, iter_rows
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SNAPSHOT_PATH = os.environ.get(
+    'CATALOG_SNAPSHOT_PATH', os.path.join(REPO_ROOT, '.cache', 'catalog_snapshot')
+)
+META_FILE = 'meta.json'
+DELETIONS_TABLE = 'destination_deletions'
+
+# Embeddings live in the vector index (vector_index.py), not the snapshot
+EXCLUDED_COLUMNS = {'embedding'}
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def _read_meta(path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _rewind(watermark: Optional[str]) -> Optional[str]:
+    if not watermark:
+        return None
+    return (datetime.fromisoformat(watermark) - SYNC_OVERLAP).isoformat()
+
+
+def _later(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """The later of two ISO timestamps (either may be None)"""
+    if not a or not b:
+        return a or b
+    return a if datetime.fromisoformat(a) >= datetime.fromisoformat(b) else b
+
+
+def snapshot_columns(supabase) -> str:
+    """
+    Select list for the sync: the table's columns minus EXCLUDED_COLUMNS,
+    taken from one probe row so columns added later are picked up too
+    """
+    probe = supabase.table('destinations').select('*').limit(1).execute().data
+    columns = [c for c in (probe[0] if probe else {'id': None}) if c not in EXCLUDED_COLUMNS]
+    return ', '.join(columns)
+
+
+def _to_table(rows: List[Dict], json_columns: set) -> 'pa.Table':
+    """Rows as an Arrow table; dicts (and lists of dicts) become JSON text"""
+    import pyarrow as pa
+    prepared = []
+    for row in rows:
+        record = {}
+        for column, value in row.items():
+            if column in EXCLUDED_COLUMNS:
+                continue
+            if isinstance(value, dict) or (isinstance(value, list) and any(isinstance(v, dict) for v in value)):
+                json_columns.add(column)
+            if column in json_columns and value is not None and not isinstance(value, str):
+                value = json.dumps(value)
+            record[column] = value
+        prepared.append(record)
+    table = pa.Table.from_pylist(prepared)
+    # A column first seen as scalar and later as JSON must be text throughout
+    for column in json_columns & set(table.column_names):
+        if not pa.types.is_string(table.schema.field(column).type):
+            position = table.column_names.index(column)
+            as_text = [None if v is None else (v if isinstance(v, str) else json.dumps(v))
+                       for v in table.column(column).to_pylist()]
+            table = table.set_column(position, column, pa.array(as_text, pa.string()))
+    return table
+
+
+def _merge(base: Optional['pa.Table'], changed: 'pa.Table', deleted_ids: List[int]) -> 'pa.Table':
+    """base without the changed/deleted ids, plus the changed rows, sorted by id"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if base is None or base.num_rows == 0:
+        merged = changed
+    else:
+        drop = set(deleted_ids)
+        if changed.num_rows:
+            drop.update(changed.column('id').to_pylist())
+        if drop:
+            keep = pc.invert(pc.is_in(base.column('id'), value_set=pa.array(sorted(drop), base.schema.field('id').type)))
+            base = base.filter(keep)
+        merged = pa.concat_tables([base, changed], promote_options='permissive') if changed.num_rows else base
+    if merged.num_rows == 0:
+        return merged
+    return merged.sort_by('id')
+
+
+def _write(path: str, table: 'pa.Table', meta: Dict):
+    """Write the next version's file, then swap meta.json to point at it"""
+    import pyarrow as pa
+    os.makedirs(path, exist_ok=True)
+    filename = f"destinations-v{meta['version']}.arrow"
+    tmp_file = os.path.join(path, filename + '.tmp')
+    with pa.OSFile(tmp_file, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, os.path.join(path, filename))
+
+    meta['file'] = filename
+    tmp_meta = os.path.join(path, META_FILE + '.tmp')
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    # Older versions stay readable by processes that already mapped them
+    for name in os.listdir(path):
+        if name.startswith('destinations-v') and name.endswith('.arrow') and name != filename:
+            os.remove(os.path.join(path, name))
+
+
+def sync_snapshot(
+    supabase,
+    path: str = DEFAULT_SNAPSHOT_PATH,
+    full: bool = False,
+    workers: int = 4,
+) -> Dict:
+    """
+    Bring the snapshot up to date. Returns {version, mode, changed, deleted,
+    count, seconds}.
+    """
+    started = time.time()
+    previous = None if full else _read_meta(path)
+    base = CatalogSnapshot(path, previous).table if previous else None
+    json_columns = set(previous.get('json_columns', [])) if previous else set()
+    columns = snapshot_columns(supabase)
+
+    if previous is None:
+        mode = 'full'
+        changed_rows = list(iter_destinations_parallel(supabase, columns, workers=workers))
+        deleted_ids: List[int] = []
+        # A full read already reflects every earlier delete
+        deletions = [{'deleted_at': datetime.fromtimestamp(started, timezone.utc).isoformat()}]
+    else:
+        mode = 'incremental'
+        since = _rewind(previous.get('watermark'))
+        changed_rows = list(iter_destinations(
+            supabase, columns, filters=(lambda q: q.gte('updated_at', since)) if since else None,
+        ))
+        deleted_since = _rewind(previous.get('deleted_watermark'))
+        deletions = list(iter_rows(
+            supabase, DELETIONS_TABLE, 'id, destination_id, deleted_at',
+            filters=(lambda q: q.gte('deleted_at', deleted_since)) if deleted_since else None,
+        ))
+        deleted_ids = [d['destination_id'] for d in deletions]
+
+    watermark = previous.get('watermark') if previous else None
+    for row in changed_rows:
+        watermark = _later(watermark, row.get('updated_at'))
+    deleted_watermark = previous.get('deleted_watermark') if previous else None
+    for deletion in deletions:
+        deleted_watermark = _later(deleted_watermark, deletion.get('deleted_at'))
+
+    changed = _to_table(changed_rows, json_columns)
+    table = _merge(base, changed, deleted_ids)
+
+    meta = {
+        'version': (previous['version'] + 1) if previous else (_read_meta(path) or {}).get('version', 0) + 1,
+        'synced_at': datetime.now(timezone.utc).isoformat(),
+        'count': table.num_rows,
+        'watermark': watermark,
+        'deleted_watermark': deleted_watermark,
+        'json_columns': sorted(json_columns),
+        'columns': table.column_names,
+    }
+    _write(path, table, meta)
+    return {
+        'version': meta['version'],
+        'mode': mode,
+        'changed': len(changed_rows),
+        'deleted': len(deleted_ids),
+        'count': table.num_rows,
+        'seconds': time.time() - started,
+    }
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of one snapshot version"""
+
+    def __init__(self, path: str, meta: Dict):
+        import pyarrow as pa
+        self.path = path
+        self.meta = meta
+        source = pa.memory_map(os.path.join(path, meta['file']), 'r')
+        self.table: 'pa.Table' = pa.ipc.open_file(source).read_all()
+        self.json_columns = set(meta.get('json_columns', []))
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_SNAPSHOT_PATH) -> 'CatalogSnapshot':
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(
+                f"No catalog snapshot in {path}; run `python catalog_snapshot.py sync` first"
+            )
+        return cls(path, meta)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def rows(self, columns: str = '*', batch_size: int = 10_000) -> Iterator[Dict]:
+        """
+        Yield rows as dicts, like iter_destinations(supabase, columns). Columns
+        the snapshot doesn't have come back as None.
+        """
+        names = [c.strip() for c in columns.split(',') if c.strip()]
+        if '*' in names:
+            names = self.table.column_names
+        present = [n for n in names if n in self.table.column_names]
+        missing = [n for n in names if n not in self.table.column_names]
+        decode = [n for n in present if n in self.json_columns]
+
+        for batch in self.table.select(present).to_batches(max_chunksize=batch_size):
+            for row in batch.to_pylist():
+                for column in decode:
+                    if row[column] is not None:
+                        row[column] = json.loads(row[column])
+                for column in missing:
+                    row[column] = None
+                yield row
+
+
+def iter_snapshot(columns: str, path: str = DEFAULT_SNAPSHOT_PATH) -> Iterator[Dict]:
+    """Drop-in for iter_destinations_parallel(supabase, columns) that reads the snapshot"""
+    return CatalogSnapshot.open(path).rows(columns)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local columnar snapshot of destinations")
+    parser.add_argument('--path', default=DEFAULT_SNAPSHOT_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sync = sub.add_parser('sync', help="pull changes since the last sync")
+    sync.add_argument('--full', action='store_true', help="re-read the whole table")
+    sync.add_argument('--workers', type=int, default=4)
+
+    sub.add_parser('info', help="show the current snapshot version")
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        print("🔄 Syncing catalog snapshot...")
+        stats = sync_snapshot(get_supabase(), args.path, args.full, args.workers)
+        print(f"✅ v{stats['version']} ({stats['mode']}): {stats['changed']} changed, "
+              f"{stats['deleted']} deleted, {stats['count']} rows in {stats['seconds']:.1f}s")
+        print(f"   Saved to: {args.path}")
+    else:
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot.open(args.path)
+        elapsed = (time.perf_counter() - started) * 1000
+        meta = snapshot.meta
+        print(f"📦 Snapshot v{meta['version']}: {meta['count']} rows, {len(meta['columns'])} columns")
+        print(f"   Synced at:  {meta['synced_at']}")
+        print(f"   Watermark:  {meta['watermark']}")
+        print(f"   Opened in {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
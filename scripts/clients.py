@@ -0,0 +1,122 @@
+"""
+Shared, lazily created clients for the scripts.
+
+Importing this module (or any script) does nothing: .env.local is read, the
+SDKs are imported and the clients are built the first time one is asked
+for, and then reused, so every stage of a run shares one Supabase client
+(one HTTP connection pool), one Gemini model, one requests session and one
+rate controller per API.
+
+Credentials only come from the environment or .env.local in the repo root:
+    NEXT_PUBLIC_SUPABASE_URL (or SUPABASE_URL)
+    SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_KEY)
+    GOOGLE_API_KEY (or GEMINI_API_KEY)                         Gemini, embeddings
+    GOOGLE_PLACES_API_KEY (or GOOGLE_MAPS_API_KEY, GOOGLE_API_KEY)  Place Details
+A missing one stops the script with an error, like the old per-script checks.
+
+Usage:
+    from clients import get_supabase
+    supabase = get_supabase()
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_FILE = os.path.join(REPO_ROOT, '.env.local')
+
+_lock = threading.RLock()
+_clients: Dict[object, object] = {}
+_env_loaded = False
+
+
+def load_env():
+    """Read .env.local once; variables already set in the environment win"""
+    global _env_loaded
+    with _lock:
+        if _env_loaded:
+            return
+        _env_loaded = True
+        try:
+            from dotenv import load_dotenv
+        except ImportError:
+            return
+        load_dotenv(ENV_FILE)
+
+
+def env(*names: str) -> Optional[str]:
+    """The first of names that is set"""
+    load_env()
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+    return None
+
+
+def require_env(*names: str) -> str:
+    value = env(*names)
+    if not value:
+        print(f"❌ Error: {' or '.join(names)} is required (environment or .env.local)")
+        sys.exit(1)
+    return value
+
+
+def _cached(key, build):
+    with _lock:
+        if key not in _clients:
+            _clients[key] = build()
+        return _clients[key]
+
+
+def supabase_url() -> str:
+    return require_env('NEXT_PUBLIC_SUPABASE_URL', 'SUPABASE_URL')
+
+
+def supabase_credentials() -> Tuple[str, str]:
+    return supabase_url(), require_env('SUPABASE_SERVICE_ROLE_KEY', 'SUPABASE_KEY')
+
+
+def get_supabase():
+    """The process-wide Supabase client"""
+    def build():
+        from supabase import create_client
+        return create_client(*supabase_credentials())
+    return _cached('supabase', build)
+
+
+def google_api_key() -> str:
+    """Key for Gemini and the embedding API"""
+    return require_env('GOOGLE_API_KEY', 'GEMINI_API_KEY')
+
+
+def places_api_key() -> str:
+    """Key for Place Details"""
+    return require_env('GOOGLE_PLACES_API_KEY', 'GOOGLE_MAPS_API_KEY', 'GOOGLE_API_KEY')
+
+
+def get_gemini_model(name: str):
+    """A shared GenerativeModel; configures the SDK on first use"""
+    def build():
+        import google.generativeai as genai
+        _cached('genai', lambda: genai.configure(api_key=google_api_key()))
+        return genai.GenerativeModel(name)
+    return _cached(('gemini', name), build)
+
+
+def http_session():
+    """A pooled requests session shared by worker threads"""
+    def build():
+        import requests
+        return requests.Session()
+    return _cached('http', build)
+
+
+def rate_controller(name: str, rate: float, max_concurrency: int = 8):
+    """The process-wide RateController for one API (see rate_controller.py)"""
+    def build():
+        from rate_controller import RateController
+        return RateController(name, rate=rate, max_concurrency=max_concurrency)
+    return _cached(('rate', name), build)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Data coverage of the destinations table: how many rows have each field
+filled (non-null), overall and broken down by city and by category.
+
+Coverage used to be measured with two `count='exact'` queries per field.
+fetch_coverage() gets every field, city and category from one aggregate
+query instead (the destination_coverage RPC,
+migrations/2025_11_08_add_destination_coverage_function.sql), so it costs one
+call at any catalog size. compute_coverage() builds the same report from
+rows in one streamed pass, for databases without the function, or offline
+from the local catalog snapshot (catalog_snapshot.py).
+
+Report:
+    {generated_at, fields, total,
+     overall:     {field: {filled, percent}},
+     by_city:     {city: {total, filled: {field: count}}},
+     by_category: {category: {total, filled: {field: count}}}}
+Rows without a city or category are grouped under "(none)".
+
+Usage:
+    python data_coverage.py [--fields rating website ...] [--stream | --snapshot] [--output coverage.json]
+"""
+
+import argparse
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from clients import get_supabase
+from destination_reader import iter_destinations_parallel
+from run_journal import results_path
+
+COVERAGE_RPC = 'destination_coverage'
+NO_VALUE = '(none)'
+
+# Fields fetch_missing_google_data.py fills from Google Places
+GOOGLE_FIELDS = [
+    'price_level',
+    'opening_hours_json',
+    'phone_number',
+    'rating',
+    'user_ratings_total',
+    'formatted_address',
+    'international_phone_number',
+    'website',
+    'latitude',
+    'longitude',
+    'tags',
+]
+
+
+def _group(groups: Dict, value: Optional[str], fields: List[str]) -> Dict:
+    key = value if value not in (None, '') else NO_VALUE
+    if key not in groups:
+        groups[key] = {'total': 0, 'filled': {field: 0 for field in fields}}
+    return groups[key]
+
+
+def _report(fields: List[str], overall: Dict, by_city: Dict, by_category: Dict) -> Dict:
+    total = overall['total']
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'fields': fields,
+        'total': total,
+        'overall': {
+            field: {
+                'filled': overall['filled'].get(field, 0),
+                'percent': round(overall['filled'].get(field, 0) / total * 100, 1) if total else 0.0,
+            }
+            for field in fields
+        },
+        'by_city': dict(sorted(by_city.items())),
+        'by_category': dict(sorted(by_category.items())),
+    }
+
+
+def fetch_coverage(supabase, fields: Iterable[str] = GOOGLE_FIELDS) -> Dict:
+    """Coverage report from one destination_coverage RPC call"""
+    fields = list(fields)
+    rows = supabase.rpc(COVERAGE_RPC, {'p_columns': fields}).execute().data or []
+
+    overall = {'total': 0, 'filled': {}}
+    by_city: Dict[str, Dict] = {}
+    by_category: Dict[str, Dict] = {}
+    for row in rows:
+        filled = {field: (row.get('filled') or {}).get(field, 0) for field in fields}
+        if row['dimension'] == 'all':
+            overall = {'total': row['total'], 'filled': filled}
+            continue
+        groups = by_city if row['dimension'] == 'city' else by_category
+        group = _group(groups, row.get('value'), fields)
+        # '' and NULL both land in "(none)"
+        group['total'] += row['total']
+        for field in fields:
+            group['filled'][field] += filled[field]
+    return _report(fields, overall, by_city, by_category)
+
+
+def compute_coverage(destinations: Iterable[Dict], fields: Iterable[str] = GOOGLE_FIELDS) -> Dict:
+    """Coverage report from destination rows (with city, category and fields), in one pass"""
+    fields = list(fields)
+    overall = {'total': 0, 'filled': {field: 0 for field in fields}}
+    by_city: Dict[str, Dict] = {}
+    by_category: Dict[str, Dict] = {}
+    for dest in destinations:
+        present = [field for field in fields if dest.get(field) is not None]
+        for group in (overall, _group(by_city, dest.get('city'), fields),
+                      _group(by_category, dest.get('category'), fields)):
+            group['total'] += 1
+            for field in present:
+                group['filled'][field] += 1
+    return _report(fields, overall, by_city, by_category)
+
+
+def stream_coverage(supabase, fields: Iterable[str] = GOOGLE_FIELDS) -> Dict:
+    """compute_coverage() over a parallel scan of the table"""
+    fields = list(fields)
+    columns = ', '.join(['city', 'category'] + [f for f in fields if f not in ('city', 'category')])
+    return compute_coverage(iter_destinations_parallel(supabase, columns), fields)
+
+
+def count_rows(supabase, table: str) -> int:
+    """Exact row count of a table without transferring its rows"""
+    return supabase.table(table).select('id', count='exact').limit(1).execute().count
+
+
+def print_coverage(report: Dict):
+    total = report['total']
+    for field, stats in report['overall'].items():
+        print(f"  {field:30} - {stats['filled']:4}/{total} ({stats['percent']:5.1f}%)")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure destination field coverage")
+    parser.add_argument('--fields', nargs='+', default=GOOGLE_FIELDS)
+    parser.add_argument('--stream', action='store_true',
+                        help="scan the rows instead of calling the destination_coverage RPC")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="scan the local catalog snapshot (catalog_snapshot.py), offline")
+    parser.add_argument('--output', default=results_path('coverage.json'))
+    args = parser.parse_args()
+
+    if args.snapshot:
+        from catalog_snapshot import iter_snapshot
+        report = compute_coverage(iter_snapshot(', '.join(['city', 'category'] + args.fields)), args.fields)
+    elif args.stream:
+        report = stream_coverage(get_supabase(), args.fields)
+    else:
+        report = fetch_coverage(get_supabase(), args.fields)
+
+    print("="*80)
+    print("DATA COVERAGE")
+    print("="*80)
+    print_coverage(report)
+    print(f"\n  {len(report['by_city'])} cities, {len(report['by_category'])} categories")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Report saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
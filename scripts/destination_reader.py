@@ -0,0 +1,238 @@
+"""
+Streaming reader for the destinations table (and any other table keyed on
+an integer id, through iter_rows).
+
+PostgREST caps every response at its max-rows setting (1000 by default), so a
+bare `supabase.table('destinations').select(...).execute()` silently drops
+everything past the cap. These helpers page through the table with keyset
+pagination on `id` and yield rows one at a time, so a full scan stays correct
+and memory stays flat no matter how large the catalog grows.
+
+Usage:
+    from destination_reader import iter_destinations, iter_destinations_parallel
+
+    for dest in iter_destinations(supabase, 'id, name, google_place_id'):
+        ...
+
+    # Only rows that have a place id, read as 4 concurrent id ranges
+    for dest in iter_destinations_parallel(
+        supabase, 'id, name, google_place_id', workers=4,
+        filters=lambda q: q.not_.is_('google_place_id', 'null'),
+    ):
+        ...
+
+    # Known ids or slugs, fetched with batched `in.(...)` filters
+    rows = {d['slug']: d for d in iter_by_keys(supabase, 'id, slug', 'slug', slugs)}
+
+    # Another table
+    for city in iter_rows(supabase, 'cities', 'slug, name'):
+        ...
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_TABLE = 'destinations'
+# Keys per `in.(...)` filter in iter_by_keys; slugs make for long URLs
+DEFAULT_KEY_CHUNK = 200
+
+# Applied to every page query, e.g. lambda q: q.not_.is_('embedding', 'null')
+QueryFilter = Callable[[object], object]
+
+_DONE = object()
+
+
+def _select_columns(columns: str) -> str:
+    """Make sure `id` is selected, since pagination is keyed on it"""
+    names = [c.strip() for c in columns.split(',') if c.strip()]
+    if '*' in names or 'id' in names:
+        return ', '.join(names)
+    return ', '.join(['id'] + names)
+
+
+def iter_pages(
+    supabase,
+    columns: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    filters: Optional[QueryFilter] = None,
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    table: str = DEFAULT_TABLE,
+) -> Iterator[List[Dict]]:
+    """
+    Yield pages of rows ordered by id, covering start_id <= id < end_id.
+
+    Each page is fetched with `id > last id seen`, so pages never overlap or
+    skip rows even while other jobs insert or delete. Reading stops on an
+    empty page rather than a short one, because a short page may just mean
+    the server's row cap is below page_size.
+    """
+    select = _select_columns(columns)
+    last_id = None
+
+    while True:
+        query = supabase.table(table).select(select)
+        if filters:
+            query = filters(query)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        elif start_id is not None:
+            query = query.gte('id', start_id)
+        if end_id is not None:
+            query = query.lt('id', end_id)
+
+        rows = query.order('id').limit(page_size).execute().data
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def iter_rows(
+    supabase,
+    table: str,
+    columns: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    filters: Optional[QueryFilter] = None,
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+) -> Iterator[Dict]:
+    """Yield the rows of table one at a time, in id order"""
+    for page in iter_pages(supabase, columns, page_size, filters, start_id, end_id, table):
+        yield from page
+
+
+def iter_destinations(
+    supabase,
+    columns: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    filters: Optional[QueryFilter] = None,
+    start_id: Optional[int] = None,
+    end_id: Optional[int] = None,
+    table: str = DEFAULT_TABLE,
+) -> Iterator[Dict]:
+    """Yield destination rows one at a time, in id order; table= for views over destinations"""
+    return iter_rows(supabase, table, columns, page_size, filters, start_id, end_id)
+
+
+def fetch_id_bounds(
+    supabase,
+    filters: Optional[QueryFilter] = None,
+    table: str = DEFAULT_TABLE,
+) -> Optional[Tuple[int, int]]:
+    """Return (min id, max id) of the matching rows, or None if there are none"""
+    def edge(desc: bool) -> Optional[int]:
+        query = supabase.table(table).select('id')
+        if filters:
+            query = filters(query)
+        rows = query.order('id', desc=desc).limit(1).execute().data
+        return rows[0]['id'] if rows else None
+
+    low = edge(desc=False)
+    if low is None:
+        return None
+    return low, edge(desc=True)
+
+
+def split_id_ranges(min_id: int, max_id: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split [min_id, max_id] into up to `parts` contiguous half-open ranges.
+
+    Ids are not guaranteed to be dense, so ranges are equal in id width,
+    not necessarily in row count.
+    """
+    span = max_id - min_id + 1
+    parts = max(1, min(parts, span))
+    step = -(-span // parts)  # ceil division
+    return [
+        (start, min(start + step, max_id + 1))
+        for start in range(min_id, max_id + 1, step)
+    ]
+
+
+def iter_destinations_parallel(
+    supabase,
+    columns: str,
+    workers: int = 4,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    filters: Optional[QueryFilter] = None,
+    table: str = DEFAULT_TABLE,
+) -> Iterator[Dict]:
+    """
+    Yield destination rows, reading `workers` id ranges concurrently.
+
+    Rows arrive in no particular order. Pages are handed over through a
+    bounded queue, so at most ~2 pages per worker are held in memory however
+    fast the readers are compared to the consumer.
+    """
+    bounds = fetch_id_bounds(supabase, filters, table)
+    if bounds is None:
+        return
+    ranges = split_id_ranges(bounds[0], bounds[1], workers)
+    if len(ranges) == 1:
+        yield from iter_destinations(supabase, columns, page_size, filters, table=table)
+        return
+
+    pages: queue.Queue = queue.Queue(maxsize=2 * len(ranges))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Poll so workers notice when the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_range(start_id: int, end_id: int):
+        try:
+            for page in iter_pages(supabase, columns, page_size, filters, start_id, end_id, table):
+                if not put(page):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        for start_id, end_id in ranges:
+            executor.submit(read_range, start_id, end_id)
+
+        try:
+            remaining = len(ranges)
+            while remaining:
+                item = pages.get()
+                if item is _DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stop.set()
+
+
+def iter_by_keys(
+    supabase,
+    columns: str,
+    key: str,
+    values: Iterable,
+    chunk_size: int = DEFAULT_KEY_CHUNK,
+    table: str = DEFAULT_TABLE,
+) -> Iterator[Dict]:
+    """
+    Yield the rows whose `key` is in values, one `in.(...)` query per chunk.
+
+    Values are de-duplicated; chunks keep each request URL well under
+    PostgREST's length limit. Missing keys are simply absent from the output.
+    """
+    unique = list(dict.fromkeys(v for v in values if v is not None))
+    for start in range(0, len(unique), chunk_size):
+        chunk = unique[start:start + chunk_size]
+        yield from supabase.table(table).select(columns).in_(key, chunk).execute().data
@@ -0,0 +1,286 @@
+"""
+Buffered bulk writers: BulkWriter for any table, DestinationWriter for the
+destinations table.
+
+Collects row updates and flushes them in batches, so a refresh of N rows costs
+roughly N / max_rows round-trips instead of N. A flush happens when max_rows
+rows are pending or when max_interval seconds have passed since the oldest
+pending row was added, and once more on close(). The interval is kept by a
+background thread that only runs while rows are pending, so a producer that
+goes quiet does not leave a partial batch waiting for close().
+
+Two write modes:
+- 'update' (default): partial updates through an RPC with the (p_key, p_rows)
+  -> (row_key, status, error) contract. DestinationWriter uses
+  bulk_update_destinations
+  (migrations/2025_11_02_add_bulk_update_destinations_function.sql); another
+  one can be plugged in with rpc=, e.g. bulk_update_destination_embeddings.
+  Rows only need the key plus the columns being changed, and rows whose key
+  is not in the table are reported as not found rather than inserted.
+- 'upsert': PostgREST upsert on the key column. Inserts missing rows, so each
+  row must carry every NOT NULL column (name, slug, ...); Postgres checks
+  those before it resolves the conflict. With ignore_duplicates=True rows
+  whose key already exists are left untouched (insert-only); they are counted
+  in `writer.ignored`, not `writer.updated`.
+
+A failing row never fails its batch: the RPC isolates rows server-side, and a
+rejected upsert batch is bisected until the bad rows are found. Failures are
+collected in `writer.failures` and passed to the optional on_failure callback;
+rows confirmed written are passed to the optional on_written callback. Rows
+that were neither written nor failed (the RPC found no row with that key, or
+skipped a row with no key or no columns, or an insert-only upsert ignored a
+duplicate) are collected in `writer.skipped` and passed to the optional
+on_skipped callback with the reason: 'not found', 'skipped' or 'duplicate'.
+`writer.bytes_sent` counts the JSON payload bytes of every request.
+
+Usage:
+    with DestinationWriter(supabase, key='id') as writer:
+        for dest in destinations:
+            writer.add({'id': dest['id'], 'tags': types})
+    print(writer.updated, len(writer.not_found), len(writer.failures))
+
+    # Another table: insert the cities that are not there yet
+    with BulkWriter(supabase, 'cities', key='slug', mode='upsert', ignore_duplicates=True) as writer:
+        ...
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_MAX_ROWS = 500
+DEFAULT_MAX_INTERVAL = 5.0  # seconds
+
+FailureCallback = Callable[[Dict, str], None]
+WrittenCallback = Callable[[Dict], None]
+# on_skipped(row, reason) for rows neither written nor failed
+SkippedCallback = Callable[[Dict, str], None]
+
+
+def _payload_bytes(payload) -> int:
+    return len(json.dumps(payload, default=str).encode('utf-8'))
+
+
+class BulkWriter:
+    """Buffers row writes to one table and flushes them as bulk requests"""
+
+    def __init__(
+        self,
+        supabase,
+        table: str,
+        key: str = 'id',
+        mode: str = 'update',
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        on_failure: Optional[FailureCallback] = None,
+        ignore_duplicates: bool = False,
+        on_written: Optional[WrittenCallback] = None,
+        rpc: Optional[str] = None,
+        on_skipped: Optional[SkippedCallback] = None,
+    ):
+        if mode not in ('update', 'upsert'):
+            raise ValueError(f"mode must be 'update' or 'upsert', got {mode!r}")
+        if mode == 'update' and not rpc:
+            raise ValueError(f"update mode needs a bulk update rpc for table {table!r}")
+
+        self.supabase = supabase
+        self.key = key
+        self.mode = mode
+        self.max_rows = max_rows
+        self.max_interval = max_interval
+        self.table = table
+        self.on_failure = on_failure
+        self.ignore_duplicates = ignore_duplicates
+        self.on_written = on_written
+        self.rpc = rpc
+        self.on_skipped = on_skipped
+
+        self.updated = 0
+        self.ignored = 0
+        self.not_found: List[str] = []
+        self.skipped: List[Dict] = []
+        self.failures: List[Dict] = []
+        self.batches = 0
+        self.bytes_sent = 0
+
+        self._pending: Dict[str, Dict] = {}
+        self._oldest: Optional[float] = None
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, row: Dict):
+        """Queue one row. Rows with the same key are merged, later values win."""
+        row_key = row.get(self.key)
+        if row_key is None:
+            raise ValueError(f"row is missing its '{self.key}' key: {row}")
+
+        with self._lock:
+            pending_key = str(row_key)
+            if pending_key in self._pending:
+                self._pending[pending_key].update(row)
+            else:
+                self._pending[pending_key] = dict(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._start_timer_locked()
+
+            due = (
+                len(self._pending) >= self.max_rows
+                or time.monotonic() - self._oldest >= self.max_interval
+            )
+            if due:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        """Write all pending rows now. Returns the number of rows sent."""
+        with self._lock:
+            return self._flush_locked()
+
+    def close(self):
+        self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _start_timer_locked(self):
+        if self.max_interval and self._timer is None:
+            self._timer = threading.Thread(
+                target=self._flush_when_due, name='destination-writer-flush', daemon=True
+            )
+            self._timer.start()
+
+    def _flush_when_due(self):
+        """Flush rows that waited max_interval with no add() to trigger it; exits once idle"""
+        try:
+            while True:
+                with self._lock:
+                    if self._oldest is None:
+                        return
+                    remaining = self._oldest + self.max_interval - time.monotonic()
+                    if remaining <= 0:
+                        self._flush_locked()
+                        return
+                time.sleep(remaining)
+        finally:
+            with self._lock:
+                self._timer = None
+                # Rows added while this thread was exiting still get a timer
+                if self._oldest is not None:
+                    self._start_timer_locked()
+
+    def _flush_locked(self) -> int:
+        rows = list(self._pending.values())
+        self._pending = {}
+        self._oldest = None
+        if not rows:
+            return 0
+
+        if self.mode == 'update':
+            self._write_update(rows)
+        else:
+            # One upsert per column set, so PostgREST never null-fills
+            # columns that some rows in the batch did not mention
+            groups: Dict[frozenset, List[Dict]] = {}
+            for row in rows:
+                groups.setdefault(frozenset(row), []).append(row)
+            for group in groups.values():
+                self._write_upsert(group)
+        return len(rows)
+
+    def _write_update(self, rows: List[Dict]):
+        self.batches += 1
+        by_key = {str(row[self.key]): row for row in rows}
+        params = {'p_key': self.key, 'p_rows': rows}
+        self.bytes_sent += _payload_bytes(params)
+        try:
+            result = self.supabase.rpc(self.rpc, params).execute()
+        except Exception as e:
+            for row in rows:
+                self._fail(row, str(e))
+            return
+
+        for outcome in result.data or []:
+            row = by_key.get(outcome.get('row_key'), {self.key: outcome.get('row_key')})
+            status = outcome.get('status')
+            if status == 'updated':
+                self.updated += 1
+                if self.on_written:
+                    self.on_written(row)
+            elif status == 'not_found':
+                self.not_found.append(outcome.get('row_key'))
+                self._skip(row, 'not found')
+            elif status == 'skipped':
+                self._skip(row, 'skipped')
+            elif status == 'failed':
+                self._fail(row, outcome.get('error') or 'unknown error')
+
+    def _write_upsert(self, rows: List[Dict]):
+        self.batches += 1
+        self.bytes_sent += _payload_bytes(rows)
+        try:
+            # Insert-only upserts return the rows actually inserted, so the
+            # ignored duplicates can be told apart
+            result = self.supabase.table(self.table).upsert(
+                rows,
+                on_conflict=self.key,
+                ignore_duplicates=self.ignore_duplicates,
+                returning='representation' if self.ignore_duplicates else 'minimal',
+            ).execute()
+        except Exception as e:
+            if len(rows) == 1:
+                self._fail(rows[0], str(e))
+                return
+            # Bisect to isolate the rows the server rejected
+            middle = len(rows) // 2
+            self._write_upsert(rows[:middle])
+            self._write_upsert(rows[middle:])
+            return
+
+        written = rows
+        if self.ignore_duplicates:
+            inserted = {str(r.get(self.key)) for r in result.data or []}
+            written = [row for row in rows if str(row[self.key]) in inserted]
+            for row in rows:
+                if str(row[self.key]) not in inserted:
+                    self.ignored += 1
+                    self._skip(row, 'duplicate')
+
+        self.updated += len(written)
+        if self.on_written:
+            for row in written:
+                self.on_written(row)
+
+    def _skip(self, row: Dict, reason: str):
+        self.skipped.append({'key': row.get(self.key), 'row': row, 'reason': reason})
+        if self.on_skipped:
+            self.on_skipped(row, reason)
+
+    def _fail(self, row: Dict, error: str):
+        self.failures.append({'key': row.get(self.key), 'row': row, 'error': error})
+        if self.on_failure:
+            self.on_failure(row, error)
+
+
+class DestinationWriter(BulkWriter):
+    """BulkWriter for the destinations table, keyed on id or slug"""
+
+    def __init__(
+        self,
+        supabase,
+        key: str = 'id',
+        mode: str = 'update',
+        table: str = 'destinations',
+        rpc: str = 'bulk_update_destinations',
+        **options,
+    ):
+        if key not in ('id', 'slug'):
+            raise ValueError(f"key must be 'id' or 'slug', got {key!r}")
+        super().__init__(supabase, table, key=key, mode=mode, rpc=rpc, **options)
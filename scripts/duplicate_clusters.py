@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Turn pairwise duplicate evidence into a merge plan.
+
+duplicate_scanner.py (names) and geo_index.py (location) report pairs
+(A≈B, B≈C, ...). Merging pair by pair
+breaks on chains: once B is merged into A, the B≈C pair points at a row that
+no longer exists. Here every pair at or above --min-similarity is fed into a
+union-find, so A, B and C end up in one cluster, and each cluster keeps the
+member with the most complete data. The others are listed for deletion.
+
+Clusters larger than --max-cluster-size are usually a chain of loosely
+similar names ("Aman", "Amanemu", "Amangiri") rather than one place, so they
+go to the plan's `review` list instead of being merged. So do clusters linked
+by a geo_index.py pair the name scan did not also report: being close
+together is not enough to delete a row.
+
+Plan format (merge_plan.json, read by merge_duplicates.py):
+    generated_at, source, min_similarity, total_clusters, total_deletes,
+    clusters: [{city, name, keep_id, keep_slug, delete_ids, delete_slugs,
+                members: [{id, slug, name, category, completeness}],
+                pairs: [{id1, id2, similarity, source}]}],
+    review: [same shape, without keep/delete, plus reason: size | geo_only]
+
+Usage:
+    python duplicate_clusters.py [--scan final_duplicate_scan.json geo_duplicate_candidates.json]
+                                 [--output merge_plan.json]
+"""
+
+import argparse
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from clients import get_supabase
+from destination_reader import iter_by_keys
+from name_matching import BUCKETS
+from run_journal import results_path
+
+DEFAULT_MIN_SIMILARITY = 0.9
+DEFAULT_MAX_CLUSTER_SIZE = 4
+
+# Columns that count towards a row's completeness; heavy columns
+# (embedding, reviews_json) are left out on purpose
+COMPLETENESS_COLUMNS = [
+    'name', 'description', 'content', 'image', 'gallery', 'architect', 'brand',
+    'year_opened', 'michelin_stars', 'neighborhood', 'category', 'country', 'city',
+    'google_place_id', 'rating', 'user_ratings_total', 'price_level',
+    'formatted_address', 'phone_number', 'website', 'opening_hours_json',
+    'latitude', 'longitude',
+]
+COLUMNS = ', '.join(['id', 'slug'] + COMPLETENESS_COLUMNS)
+
+
+class UnionFind:
+    """Disjoint sets over hashable items, with path halving and union by size"""
+
+    def __init__(self):
+        self.parent: Dict = {}
+        self.size: Dict = {}
+
+    def find(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def groups(self) -> List[List]:
+        """Every set with more than one member, members in insertion order"""
+        groups: Dict = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+def is_filled(value) -> bool:
+    return value not in (None, '', [], {}, 0)
+
+
+def completeness(dest: Dict) -> Tuple[int, int, int]:
+    """
+    Sort key for picking the row to keep: filled columns, then amount of
+    text, then the older (lower) id
+    """
+    filled = sum(1 for column in COMPLETENESS_COLUMNS if is_filled(dest.get(column)))
+    text = len(dest.get('description') or '') + len(dest.get('content') or '')
+    return filled, text, -dest['id']
+
+
+def report_pairs(report: Dict, min_similarity: float) -> List[Dict]:
+    """
+    Pairs at or above min_similarity from a duplicate_scanner.py report (pairs
+    by bucket) or a geo_index.py one (a single `pairs` list), each with a
+    `source`: 'name' or 'geo'
+    """
+    buckets = ['exact_matches'] + [bucket for bucket, _ in BUCKETS] + ['pairs']
+    return [
+        dict(pair, source=pair.get('source') or ('geo' if bucket == 'pairs' else 'name'))
+        for bucket in buckets
+        for pair in report.get(bucket, [])
+        if pair['similarity'] >= min_similarity
+    ]
+
+
+def cluster_pairs(pairs: Iterable[Dict]) -> List[Tuple[List[int], List[Dict]]]:
+    """Group pairs into clusters: [(member ids, pairs inside the cluster)]"""
+    pairs = list(pairs)
+    sets = UnionFind()
+    for pair in pairs:
+        sets.union(pair['id1'], pair['id2'])
+
+    evidence: Dict = {}
+    for pair in pairs:
+        evidence.setdefault(sets.find(pair['id1']), []).append(pair)
+    return [(members, evidence[sets.find(members[0])]) for members in sets.groups()]
+
+
+def build_merge_plan(
+    pairs: Iterable[Dict],
+    destinations: Dict[int, Dict],
+    max_cluster_size: int = DEFAULT_MAX_CLUSTER_SIZE,
+) -> Dict:
+    """
+    Merge plan for the clusters formed by pairs. `destinations` maps id to a
+    row with COLUMNS; members missing from it (already deleted) are dropped.
+    Clusters that need a geo pair to hold together go to review.
+    """
+    pairs = list(pairs)
+    name_confirmed = {
+        frozenset((p['id1'], p['id2'])) for p in pairs if p.get('source') != 'geo'
+    }
+    clusters, review = [], []
+    for member_ids, evidence in cluster_pairs(pairs):
+        rows = [destinations[i] for i in member_ids if i in destinations]
+        if len(rows) < 2:
+            continue
+        rows.sort(key=completeness, reverse=True)
+        keep, deletes = rows[0], rows[1:]
+
+        entry = {
+            'city': keep.get('city'),
+            'name': keep.get('name'),
+            'members': [
+                {
+                    'id': row['id'],
+                    'slug': row.get('slug'),
+                    'name': row.get('name'),
+                    'category': row.get('category'),
+                    'completeness': completeness(row)[0],
+                }
+                for row in rows
+            ],
+            'pairs': [
+                {
+                    'id1': p['id1'], 'id2': p['id2'], 'similarity': p['similarity'],
+                    'source': p.get('source', 'name'),
+                }
+                for p in evidence
+            ],
+        }
+        if len(rows) > max_cluster_size:
+            review.append(dict(entry, reason='size'))
+            continue
+        if any(frozenset((p['id1'], p['id2'])) not in name_confirmed for p in evidence):
+            review.append(dict(entry, reason='geo_only'))
+            continue
+        entry.update({
+            'keep_id': keep['id'],
+            'keep_slug': keep.get('slug'),
+            'delete_ids': [row['id'] for row in deletes],
+            'delete_slugs': [row.get('slug') for row in deletes],
+        })
+        clusters.append(entry)
+
+    clusters.sort(key=lambda c: (c['city'] or '', c['keep_id']))
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'total_clusters': len(clusters),
+        'total_deletes': sum(len(c['delete_ids']) for c in clusters),
+        'clusters': clusters,
+        'review': review,
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster duplicate pairs into a merge plan")
+    parser.add_argument('--scan', nargs='+', default=[results_path('final_duplicate_scan.json')],
+                        help="duplicate_scanner.py and/or geo_index.py reports")
+    parser.add_argument('--output', default=results_path('merge_plan.json'))
+    parser.add_argument('--min-similarity', type=float, default=DEFAULT_MIN_SIMILARITY,
+                        help="pairs below this similarity are ignored")
+    parser.add_argument('--max-cluster-size', type=int, default=DEFAULT_MAX_CLUSTER_SIZE,
+                        help="larger clusters go to manual review instead of the plan")
+    parser.add_argument('--same-category', action='store_true',
+                        help="only link pairs whose categories match")
+    args = parser.parse_args()
+
+    print("="*80)
+    print("DUPLICATE CLUSTERING")
+    print("="*80)
+
+    pairs = []
+    for path in args.scan:
+        with open(path) as f:
+            pairs.extend(report_pairs(json.load(f), args.min_similarity))
+    if args.same_category:
+        pairs = [p for p in pairs if (p.get('category1') or '') == (p.get('category2') or '')]
+    print(f"\n📊 {len(pairs)} pairs at ≥{args.min_similarity:.0%} similarity in {', '.join(args.scan)}")
+
+    ids = {p['id1'] for p in pairs} | {p['id2'] for p in pairs}
+    print(f"📥 Loading {len(ids)} destinations...")
+    destinations = {
+        dest['id']: dest for dest in iter_by_keys(get_supabase(), COLUMNS, 'id', ids)
+    }
+
+    plan = build_merge_plan(pairs, destinations, args.max_cluster_size)
+    plan['source'] = args.scan
+    plan['min_similarity'] = args.min_similarity
+
+    with open(args.output, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+    print(f"\n  🔗 Clusters to merge:   {plan['total_clusters']}")
+    print(f"  🗑️  Rows to delete:      {plan['total_deletes']}")
+    print(f"  ⚠️  Clusters to review:  {len(plan['review'])}")
+    print(f"\n✅ Merge plan saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
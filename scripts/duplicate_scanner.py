@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Vectorized near-duplicate scanner for destinations.
+
+final_duplicate_scan.json used to come from comparing every pair of names in
+a city one SequenceMatcher call at a time, which grows quadratically. Here
+each city's normalized names (normalize_name() rules) become rows of a sparse
+matrix of square-rooted character counts, and X @ X.T, computed in row
+blocks, bounds every pair's similarity at once:
+
+    ratio <= quick_ratio = 2 * sum(min(a_c, b_c)) / (len a + len b)
+                        <= 2 * sum(sqrt(a_c * b_c)) / (len a + len b)
+
+since min(x, y) <= sqrt(x * y). A pair whose bound is below MIN_SIMILARITY
+cannot reach it, so skipping it loses nothing, and only the rest are
+verified with SequenceMatcher: the report holds exactly the pairs the
+all-pairs loop found, with the same similarity and confidence buckets.
+Cities are spread across a process pool, largest first.
+
+Report format (unchanged): scan_date, total_destinations, total_comparisons
+and the exact_matches / very_high_confidence / high_confidence /
+medium_confidence / low_confidence pair lists.
+
+Usage:
+    python duplicate_scanner.py [--output final_duplicate_scan.json] [--workers 8] [--snapshot]
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from clients import get_supabase
+from destination_reader import iter_destinations_parallel
+from name_matching import BUCKETS, MIN_SIMILARITY, normalize_name
+from run_journal import results_path
+
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+# Upper bound on similarity cells materialized per block (rows x city size)
+BLOCK_CELLS = 8_000_000
+
+COLUMNS = 'id, slug, name, category, city, country'
+
+
+def char_matrix(names: List[str]) -> Tuple['sparse.csr_matrix', 'np.ndarray']:
+    """Rows: square roots of each name's character counts; and the name lengths"""
+    import numpy as np
+    from scipy import sparse
+    vocabulary: Dict[str, int] = {}
+    indptr, indices, counts = [0], [], []
+    for name in names:
+        chars: Dict[int, int] = {}
+        for char in name:
+            column = vocabulary.setdefault(char, len(vocabulary))
+            chars[column] = chars.get(column, 0) + 1
+        indices.extend(chars)
+        counts.extend(chars.values())
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.sqrt(np.asarray(counts, dtype=np.float64)), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+        shape=(len(names), max(1, len(vocabulary))),
+    )
+    return matrix, np.asarray([len(name) for name in names], dtype=np.float64)
+
+
+def candidate_pairs(matrix: 'sparse.csr_matrix', lengths: 'np.ndarray', threshold: float) -> Iterable[Tuple[int, int]]:
+    """Pairs (i < j) whose quick_ratio upper bound is at least threshold"""
+    import numpy as np
+    n = matrix.shape[0]
+    transposed = matrix.T.tocsr()
+    block = max(1, BLOCK_CELLS // max(n, 1))
+    for start in range(0, n, block):
+        scores = (matrix[start:start + block] @ transposed).tocoo()
+        rows = scores.row + start
+        total = lengths[rows] + lengths[scores.col]
+        bound = 2 * scores.data / np.maximum(total, 1)
+        # A hair of slack for float rounding; SequenceMatcher has the final say
+        keep = (bound >= threshold - 1e-9) & (rows < scores.col)
+        yield from zip(rows[keep].tolist(), scores.col[keep].tolist())
+
+
+def scan_city(args) -> Tuple[List[Dict], int]:
+    """Verified duplicate pairs in one city, and the number of pairs covered"""
+    city, rows = args
+    # Same pair orientation as the old scan: by name
+    rows = sorted(rows, key=lambda r: (r.get('name') or '', r['id']))
+    normalized = [normalize_name(r.get('name')) for r in rows]
+    comparisons = len(rows) * (len(rows) - 1) // 2
+    if len(rows) < 2:
+        return [], comparisons
+
+    pairs = []
+    matcher = SequenceMatcher(None)
+    for i, j in candidate_pairs(*char_matrix(normalized), MIN_SIMILARITY):
+        a, b = normalized[i], normalized[j]
+        if not a or not b:
+            continue
+        matcher.set_seqs(a, b)
+        if matcher.real_quick_ratio() < MIN_SIMILARITY or matcher.quick_ratio() < MIN_SIMILARITY:
+            continue
+        score = 1.0 if a == b else matcher.ratio()
+        if score < MIN_SIMILARITY:
+            continue
+        first, second = rows[i], rows[j]
+        pairs.append({
+            'name1': first.get('name'),
+            'slug1': first.get('slug'),
+            'id1': first['id'],
+            'category1': first.get('category'),
+            'name2': second.get('name'),
+            'slug2': second.get('slug'),
+            'id2': second['id'],
+            'category2': second.get('category'),
+            'city': city,
+            'country': first.get('country'),
+            'similarity': score,
+            'normalized_name1': a,
+            'normalized_name2': b,
+        })
+    return pairs, comparisons
+
+
+def bucket_for(similarity: float) -> Optional[str]:
+    if similarity >= 1.0:
+        return 'exact_matches'
+    for bucket, floor in BUCKETS:
+        if similarity >= floor:
+            return bucket
+    return None
+
+
+def scan_duplicates(
+    destinations: Iterable[Dict],
+    workers: Optional[int] = None,
+) -> Dict:
+    """Scan destinations city by city and return the duplicate report"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    cities: Dict[str, List[Dict]] = {}
+    total = 0
+    for dest in destinations:
+        total += 1
+        cities.setdefault(dest.get('city') or '', []).append(dest)
+
+    report = {
+        'scan_date': date.today().isoformat(),
+        'total_destinations': total,
+        'total_comparisons': 0,
+        'exact_matches': [],
+        **{bucket: [] for bucket, _ in BUCKETS},
+    }
+
+    # Largest cities first, so the pool isn't left waiting on one big city at the end
+    tasks = [
+        (city, rows)
+        for city, rows in sorted(cities.items(), key=lambda item: -len(item[1]))
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pairs, comparisons in pool.map(scan_city, tasks):
+            report['total_comparisons'] += comparisons
+            for pair in pairs:
+                report[bucket_for(pair['similarity'])].append(pair)
+
+    for bucket in ['exact_matches'] + [b for b, _ in BUCKETS]:
+        report[bucket].sort(key=lambda p: (-p['similarity'], p['city'], p['id1'], p['id2']))
+    return report
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan destinations for near-duplicate names")
+    parser.add_argument('--output', default=results_path('final_duplicate_scan.json'))
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="read the local catalog snapshot (catalog_snapshot.py) instead of Supabase")
+    args = parser.parse_args()
+
+    print("="*80)
+    print("DUPLICATE SCAN")
+    print("="*80)
+
+    print("\n📊 Loading destinations...")
+    if args.snapshot:
+        from catalog_snapshot import iter_snapshot
+        destinations = list(iter_snapshot(COLUMNS))
+    else:
+        destinations = list(iter_destinations_parallel(get_supabase(), COLUMNS))
+    print(f"   Found {len(destinations)} destinations")
+
+    print("\n🔍 Scanning for duplicates...")
+    started = time.time()
+    report = scan_duplicates(destinations, args.workers)
+    elapsed = time.time() - started
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"   {report['total_comparisons']:,} pairs covered in {elapsed:.1f}s\n")
+    print(f"  🎯 Exact matches:        {len(report['exact_matches'])}")
+    print(f"  🔴 Very high confidence: {len(report['very_high_confidence'])}")
+    print(f"  🟠 High confidence:      {len(report['high_confidence'])}")
+    print(f"  🟡 Medium confidence:    {len(report['medium_confidence'])}")
+    print(f"  ⚪ Low confidence:       {len(report['low_confidence'])}")
+    print(f"\n✅ Report saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
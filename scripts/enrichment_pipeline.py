@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Run the destination enrichment steps as one streaming pipeline.
+
+fetch_google_types.py, fetch_missing_google_data.py, generate_ai_fields.py
+and generate_embeddings.py each read the whole catalog and finish every row
+before the next one starts. Here the catalog is read once and every
+destination streams through the stages (pipeline.py), each with its own
+concurrency and rate budget:
+
+    places      Place Details for the columns that are missing or stale
+                (places_field_planner.py); this covers the Google types ->
+                tags refresh of fetch_google_types.py as well
+    ai_fields   Gemini vibe_tags / keywords / summary for destinations whose
+                prompt inputs changed, packed several to a request
+    embeddings  after ai_fields: re-embeds destinations whose search text
+                changed, including text the ai_fields stage just wrote
+
+Nothing in the embedding search text comes from Places, so places and
+ai_fields run side by side, and a destination is embedded as soon as its own
+AI fields land instead of after the whole catalog has been generated.
+
+Each stage checks staleness the same way its script does (field plan,
+ai_fields_fingerprint, embedding_fingerprint), so a re-run after an
+interruption only redoes unfinished work. Per-stage counters and failures go
+to enrichment_pipeline_results.json in the repo root (run_journal.results_path).
+
+Usage:
+    python enrichment_pipeline.py
+    python enrichment_pipeline.py --stages ai_fields,embeddings --limit 100
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from clients import get_supabase, google_api_key, places_api_key, rate_controller
+from destination_reader import iter_destinations, iter_destinations_parallel
+from destination_writer import DestinationWriter
+from pipeline import Pipeline, Stage
+from places_field_planner import (
+    COLUMN_FIELDS, PLANNER_COLUMNS, VOLATILE_COLUMNS, extract_data_for_update, needed_columns,
+)
+from run_journal import results_path
+
+STAGES = ('places', 'ai_fields', 'embeddings')
+
+# Columns each stage reads (the embedding search text also uses the AI fields)
+PLACES_COLUMNS = ['google_place_id'] + PLANNER_COLUMNS
+AI_FIELDS_COLUMNS = [
+    'name', 'city', 'category', 'description', 'content', 'michelin_stars',
+    'ai_inputs_fingerprint', 'ai_fields_fingerprint', 'ai_fields_generated_at',
+]
+EMBEDDING_COLUMNS = [
+    'name', 'description', 'content', 'city', 'category', 'country',
+    'vibe_tags', 'keywords', 'search_keywords', 'short_summary', 'editorial_summary',
+    'embedding_fingerprint',
+]
+
+# Places request budget: requests in flight and overall requests/second
+PLACES_CONCURRENCY = int(os.environ.get("PLACES_CONCURRENCY", "16"))
+PLACES_QPS = float(os.environ.get("PLACES_QPS", "50"))
+PLACES_BATCH_SIZE = 200
+
+
+def source_columns(stages: List[str]) -> str:
+    columns = ['id', 'slug']
+    if 'places' in stages:
+        columns += PLACES_COLUMNS
+    if 'ai_fields' in stages:
+        columns += AI_FIELDS_COLUMNS
+    if 'embeddings' in stages:
+        columns += EMBEDDING_COLUMNS
+    return ', '.join(dict.fromkeys(columns))
+
+
+def _write(writer: DestinationWriter, rows: List[Dict], batch: List[Dict], failures: Dict):
+    """Write rows now; rows that failed or no longer exist are added to failures"""
+    for row in rows:
+        writer.add(row)
+    writer.flush()
+    ids = {str(dest['id']): dest['id'] for dest in batch}
+    for key in writer.not_found:
+        failures[ids.get(key, key)] = 'not found'
+
+
+def places_stage(supabase, api_key: str, refresh_days, concurrency: int, qps: float) -> Stage:
+    import asyncio
+
+    from places_cache import PlacesCache
+    from places_fetcher import PlacesFetcher, refresh_places
+
+    refresh_before = None
+    if refresh_days:
+        refresh_before = datetime.now(timezone.utc) - timedelta(days=refresh_days)
+    cache = PlacesCache()
+    all_fields = sorted(set(COLUMN_FIELDS.values()))
+    columns_by_id: Dict = {}
+
+    def wants(dest):
+        if not dest.get('google_place_id'):
+            return False
+        columns = needed_columns(dest, refresh_before)
+        if columns:
+            columns_by_id[dest['id']] = columns
+        return bool(columns)
+
+    def fields_for(dest):
+        return sorted({COLUMN_FIELDS[c] for c in columns_by_id[dest['id']]})
+
+    # One event loop and one open fetcher (aiohttp session) per worker thread,
+    # reused for every batch; the rate controller is shared process-wide
+    worker = threading.local()
+
+    def worker_fetcher():
+        if not hasattr(worker, 'fetcher'):
+            worker.loop = asyncio.new_event_loop()
+            worker.fetcher = PlacesFetcher(
+                api_key, concurrency, qps, cache=cache,
+                rate=rate_controller('places', rate=qps, max_concurrency=concurrency),
+            )
+            worker.loop.run_until_complete(worker.fetcher.__aenter__())
+        return worker.loop, worker.fetcher
+
+    def teardown():
+        if hasattr(worker, 'fetcher'):
+            worker.loop.run_until_complete(worker.fetcher.__aexit__(None, None, None))
+            worker.loop.run_until_complete(worker.loop.shutdown_default_executor())
+            worker.loop.close()
+
+    def process(batch):
+        failures = {}
+        enriched_at = datetime.now(timezone.utc).isoformat()
+
+        def to_row(dest, result):
+            update_data = extract_data_for_update(result) or {}
+            columns = columns_by_id[dest['id']]
+            # Only mark the row fresh once its volatile fields were actually refetched
+            if all(c in columns for c in VOLATILE_COLUMNS):
+                update_data['last_enriched_at'] = enriched_at
+            if not update_data:
+                return None
+            dest.update(update_data)
+            return {'id': dest['id'], **update_data}
+
+        writer = DestinationWriter(
+            supabase, key='id', max_rows=len(batch),
+            on_failure=lambda row, error: failures.__setitem__(row['id'], f"write: {error}"),
+        )
+        loop, fetcher = worker_fetcher()
+        try:
+            loop.run_until_complete(refresh_places(
+                api_key, batch, fields=all_fields, fields_for=fields_for, to_row=to_row,
+                writer=writer, concurrency=concurrency, fetcher=fetcher,
+                on_error=lambda dest, error: failures.__setitem__(dest['id'], f"fetch: {error}"),
+            ))
+            _write(writer, [], batch, failures)
+        finally:
+            for dest in batch:
+                columns_by_id.pop(dest['id'], None)
+        return failures
+
+    return Stage('places', process, concurrency=1, batch_size=PLACES_BATCH_SIZE, wants=wants,
+                 teardown=teardown)
+
+
+def ai_fields_stage(supabase, concurrency: int, pack_size: int, use_cache: bool) -> Stage:
+    from ai_fields_cache import AiFieldsCache, cache_key
+    from generate_ai_fields import (
+        MAX_PACK_SIZE, MODEL_NAME, PROMPT_TEMPLATE_VERSION, generate_ai_fields_packed, prompt_inputs,
+    )
+
+    cache = AiFieldsCache()
+    pack_size = max(1, min(pack_size, MAX_PACK_SIZE))
+
+    def wants(dest):
+        # Same rule as the destinations_ai_fields_pending view
+        if not dest.get('slug'):
+            return False
+        return (dest.get('ai_fields_generated_at') is None
+                or dest.get('ai_fields_fingerprint') != dest.get('ai_inputs_fingerprint'))
+
+    def process(batch):
+        failures = {}
+        generated = {}
+        keys = {dest['id']: cache_key(MODEL_NAME, PROMPT_TEMPLATE_VERSION, prompt_inputs(dest)) for dest in batch}
+        to_generate = []
+        for dest in batch:
+            fields = cache.get(keys[dest['id']]) if use_cache else None
+            if fields is None:
+                to_generate.append(dest)
+            else:
+                generated[dest['id']] = fields
+
+        if to_generate:
+            outcomes, _ = generate_ai_fields_packed(to_generate)
+            for dest, fields, error in outcomes:
+                if not fields:
+                    failures[dest['id']] = error
+                    continue
+                cache.put(keys[dest['id']], fields)
+                generated[dest['id']] = fields
+
+        rows = []
+        generated_at = datetime.now(timezone.utc).isoformat()
+        for dest in batch:
+            fields = generated.get(dest['id'])
+            if fields is None:
+                continue
+            rows.append({
+                'id': dest['id'],
+                **fields,
+                'ai_fields_generated_at': generated_at,
+                # Marks the fields current until the inputs change again
+                'ai_fields_fingerprint': dest.get('ai_inputs_fingerprint'),
+            })
+        writer = DestinationWriter(
+            supabase, key='id', max_rows=len(batch),
+            on_failure=lambda row, error: failures.__setitem__(row['id'], f"write: {error}"),
+        )
+        _write(writer, rows, batch, failures)
+
+        # The embeddings stage builds its search text from these
+        by_id = {dest['id']: dest for dest in batch}
+        for row in rows:
+            if row['id'] not in failures:
+                by_id[row['id']].update({k: v for k, v in row.items() if k != 'id'})
+        return failures
+
+    return Stage('ai_fields', process, concurrency=concurrency, batch_size=pack_size,
+                 max_wait=5.0, wants=wants)
+
+
+def embeddings_stage(supabase, concurrency: int, batch_size: int, encoding: str, after) -> Stage:
+    from generate_embeddings import (
+        EMBED_BATCH_SIZE, EMBEDDING_MODEL_NAME, build_search_text, embedding_fingerprint,
+        encode_embedding, generate_embeddings_batch,
+    )
+
+    batch_size = max(1, min(batch_size, EMBED_BATCH_SIZE))
+
+    def wants(dest):
+        # Rows without any searchable text are left alone, as in generate_embeddings.py
+        search_text = build_search_text(dest)
+        return bool(search_text) and embedding_fingerprint(search_text) != dest.get('embedding_fingerprint')
+
+    def process(batch):
+        failures = {}
+        texts = [build_search_text(dest) for dest in batch]
+        embeddings = generate_embeddings_batch(texts)
+        updated_at = datetime.now(timezone.utc).isoformat()
+
+        rows = []
+        for dest, search_text, embedding in zip(batch, texts, embeddings):
+            if not embedding:
+                failures[dest['id']] = 'embedding failed'
+                continue
+            rows.append({
+                'id': dest['id'],
+                'embedding': encode_embedding(embedding, encoding),
+                'search_text': search_text,
+                'embedding_model': EMBEDDING_MODEL_NAME,
+                'embedding_fingerprint': embedding_fingerprint(search_text),
+                'embedding_updated_at': updated_at,
+            })
+        # Packed float32 embeddings, many rows per call
+        writer = DestinationWriter(
+            supabase, key='id', max_rows=len(batch), rpc='bulk_update_destination_embeddings',
+            on_failure=lambda row, error: failures.__setitem__(row['id'], f"write: {error}"),
+        )
+        _write(writer, rows, batch, failures)
+        by_id = {dest['id']: dest for dest in batch}
+        for row in rows:
+            if row['id'] not in failures:
+                by_id[row['id']]['embedding_fingerprint'] = row['embedding_fingerprint']
+        return failures
+
+    return Stage('embeddings', process, after=after, concurrency=concurrency,
+                 batch_size=batch_size, max_wait=5.0, wants=wants)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream destinations through the enrichment stages")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument('--limit', type=int, help="only the first N destinations (by id)")
+    parser.add_argument('--workers', type=int, default=4, help="parallel catalog readers")
+    parser.add_argument('--places-concurrency', type=int, default=PLACES_CONCURRENCY,
+                        help="Places requests in flight")
+    parser.add_argument('--places-qps', type=float, default=PLACES_QPS)
+    parser.add_argument('--refresh-days', type=float, default=30,
+                        help="refetch rating/hours/reviews enriched longer ago than this (0 = only fill missing columns)")
+    parser.add_argument('--ai-concurrency', type=int, default=4, help="Gemini requests in flight")
+    parser.add_argument('--pack', type=int, default=10, help="destinations per Gemini request")
+    parser.add_argument('--no-cache', action='store_true', help="ignore cached AI field generations")
+    parser.add_argument('--embed-concurrency', type=int, default=2, help="embedding calls in flight")
+    parser.add_argument('--embed-batch-size', type=int, default=100, help="texts per embedding call")
+    parser.add_argument('--encoding', choices=['base64', 'array'], default='base64',
+                        help="embedding wire format for the bulk write")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown or not stages:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}" if unknown else "no stages given")
+
+    print("="*70)
+    print("ENRICHMENT PIPELINE")
+    print("="*70)
+    print(f"\n🧩 Stages: {' | '.join(stages)}")
+
+    supabase = get_supabase()
+    if 'ai_fields' in stages or 'embeddings' in stages:
+        google_api_key()
+    pipeline_stages = []
+    if 'places' in stages:
+        pipeline_stages.append(places_stage(
+            supabase, places_api_key(), args.refresh_days or None, args.places_concurrency, args.places_qps
+        ))
+    if 'ai_fields' in stages:
+        pipeline_stages.append(ai_fields_stage(supabase, args.ai_concurrency, args.pack, not args.no_cache))
+    if 'embeddings' in stages:
+        after = ('ai_fields',) if 'ai_fields' in stages else ()
+        pipeline_stages.append(embeddings_stage(
+            supabase, args.embed_concurrency, args.embed_batch_size, args.encoding, after
+        ))
+
+    failures: List[Dict] = []
+
+    def report_failure(stage, dest, error):
+        failures.append({'stage': stage, 'id': dest['id'], 'slug': dest.get('slug'), 'error': error})
+        print(f"  ❌ [{stage}] {dest.get('slug') or dest['id']}: {error}")
+
+    if args.limit:
+        # The parallel reader yields ranges out of order; --limit promises the first N by id.
+        source = itertools.islice(iter_destinations(supabase, source_columns(stages)), args.limit)
+    else:
+        source = iter_destinations_parallel(supabase, source_columns(stages), workers=args.workers)
+
+    print("\n🚀 Streaming destinations...\n")
+    start_time = time.time()
+    stats = Pipeline(pipeline_stages, on_failure=report_failure).run(source)
+    elapsed = time.time() - start_time
+
+    print("\n" + "="*70)
+    print("ENRICHMENT COMPLETE!")
+    print("="*70)
+    print(f"\n{'Stage':12} {'Seen':>7} {'Done':>7} {'Failed':>7} {'Skipped':>8} {'Blocked':>8} {'Busy':>8}")
+    for name, stage_stats in stats.items():
+        print(f"{name:12} {stage_stats['received']:7} {stage_stats['processed']:7} "
+              f"{stage_stats['failed']:7} {stage_stats['skipped']:8} {stage_stats['blocked']:8} "
+              f"{stage_stats['busy_seconds']/60:7.1f}m")
+    print(f"\n⏱️  Wall time: {elapsed/60:.1f} minutes")
+
+    results_file = results_path('enrichment_pipeline_results.json')
+    with open(results_file, 'w') as f:
+        json.dump({
+            'stages': stats,
+            'elapsed_seconds': round(elapsed, 1),
+            'failures': failures,
+        }, f, indent=2)
+    print(f"📁 Results saved to: {results_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Geo-proximity index for duplicate candidates.
+
+Name matching alone misses pairs like "Hotel Toranomon Hills" and "Toranomon
+Hills", but both rows carry the latitude/longitude fetch_missing_google_data.py
+wrote. GeoIndex buckets destinations into a grid of cells one radius wide, so
+all pairs within the radius are found by comparing each point with its
+neighbouring cells only: near-linear in the catalog size instead of N².
+
+The grid is laid over unit-sphere (x, y, z) coordinates rather than raw
+degrees, so cells stay the same size at every latitude and across the
+antimeridian. A straight-line (chord) distance is never longer than the
+great-circle one, so no pair within the radius is missed; candidates are then
+confirmed with the haversine distance.
+
+Each pair gets a combined score:
+    score = NAME_WEIGHT * name_similarity + (1 - NAME_WEIGHT) * (1 - distance / radius)
+where name_similarity is the better of the SequenceMatcher ratio and the
+share of both names' words they have in common (at least two, capped at
+CONTAINMENT_CAP). Location is weak evidence on its own, so pairs are tagged
+`source: geo` and duplicate_clusters.py sends clusters resting on them to
+manual review rather than the merge plan.
+
+Report (geo_duplicate_candidates.json): scan_date, radius_m,
+total_destinations, pairs: [{name1, slug1, id1, category1, name2, slug2, id2,
+category2, city, country, distance_m, name_similarity, similarity, source}], where
+`similarity` is the combined score, so duplicate_clusters.py can read the
+report like a duplicate_scanner.py one.
+
+Usage:
+    python geo_index.py [--radius 150] [--min-score 0.75] [--output geo_duplicate_candidates.json]
+"""
+
+import argparse
+import json
+import math
+import time
+from datetime import date
+from difflib import SequenceMatcher
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from clients import get_supabase
+from destination_reader import iter_destinations_parallel
+from name_matching import normalize_name
+from run_journal import results_path
+
+EARTH_RADIUS_M = 6_371_000
+DEFAULT_RADIUS_M = 150.0
+DEFAULT_MIN_SCORE = 0.75
+NAME_WEIGHT = 0.7
+# Ceiling for word-containment matches, so a name that is a subset of another
+# ("Park" / "Park Hyatt") can't reach duplicate_clusters.py's merge threshold
+# on name evidence alone, however close the two points are
+CONTAINMENT_CAP = 0.8
+
+COLUMNS = 'id, slug, name, category, city, country, latitude, longitude'
+
+_NEIGHBOURS = list(product((-1, 0, 1), repeat=3))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Point on a sphere of the Earth's radius, in metres"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (
+        EARTH_RADIUS_M * math.cos(phi) * math.cos(lam),
+        EARTH_RADIUS_M * math.cos(phi) * math.sin(lam),
+        EARTH_RADIUS_M * math.sin(phi),
+    )
+
+
+def name_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two normalized names, forgiving a missing word or two: the
+    better of the SequenceMatcher ratio and the word overlap (shared words /
+    all words), the latter only when at least two words are shared and never
+    above CONTAINMENT_CAP
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    words_a, words_b = set(a.split()), set(b.split())
+    shared = words_a & words_b
+    containment = 0.0
+    if len(shared) >= 2:
+        containment = min(CONTAINMENT_CAP, len(shared) / len(words_a | words_b))
+    return max(ratio, containment)
+
+
+class GeoIndex:
+    """Grid-bucketed destinations with coordinates"""
+
+    def __init__(self, records: Iterable[Dict], radius_m: float = DEFAULT_RADIUS_M):
+        if radius_m <= 0:
+            raise ValueError(f"radius must be positive, got {radius_m}")
+        self.radius_m = radius_m
+        self.records: List[Dict] = []
+        self.points: List[Tuple[float, float, float]] = []
+        self.cells: Dict[Tuple[int, int, int], List[int]] = {}
+        for record in records:
+            lat, lon = record.get('latitude'), record.get('longitude')
+            if lat is None or lon is None:
+                continue
+            position = len(self.records)
+            point = to_xyz(float(lat), float(lon))
+            self.records.append(record)
+            self.points.append(point)
+            self.cells.setdefault(self._cell(point), []).append(position)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _cell(self, point) -> Tuple[int, int, int]:
+        return tuple(math.floor(c / self.radius_m) for c in point)
+
+    def distance_m(self, i: int, j: int) -> float:
+        a, b = self.records[i], self.records[j]
+        return haversine_m(float(a['latitude']), float(a['longitude']),
+                           float(b['latitude']), float(b['longitude']))
+
+    def near(self, lat: float, lon: float) -> List[Tuple[Dict, float]]:
+        """Records within the radius of a point, nearest first"""
+        point = to_xyz(lat, lon)
+        cx, cy, cz = self._cell(point)
+        found = []
+        for dx, dy, dz in _NEIGHBOURS:
+            for position in self.cells.get((cx + dx, cy + dy, cz + dz), ()):
+                record = self.records[position]
+                distance = haversine_m(lat, lon, float(record['latitude']), float(record['longitude']))
+                if distance <= self.radius_m:
+                    found.append((record, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def pairs_within(self) -> Iterator[Tuple[int, int, float]]:
+        """Every pair (i < j) of record positions within the radius, with its distance"""
+        for (cx, cy, cz), members in self.cells.items():
+            for dx, dy, dz in _NEIGHBOURS:
+                neighbour = (cx + dx, cy + dy, cz + dz)
+                # Visit each pair of cells once
+                if neighbour < (cx, cy, cz):
+                    continue
+                others = self.cells.get(neighbour)
+                if not others:
+                    continue
+                same = neighbour == (cx, cy, cz)
+                for a, i in enumerate(members):
+                    for j in (members[a + 1:] if same else others):
+                        distance = self.distance_m(i, j)
+                        if distance <= self.radius_m:
+                            yield (i, j, distance) if i < j else (j, i, distance)
+
+    def candidate_pairs(self, min_score: float = DEFAULT_MIN_SCORE) -> List[Dict]:
+        """Pairs within the radius scoring at least min_score, best first"""
+        normalized = [normalize_name(r.get('name')) for r in self.records]
+        pairs = []
+        for i, j, distance in self.pairs_within():
+            name_score = name_similarity(normalized[i], normalized[j])
+            score = NAME_WEIGHT * name_score + (1 - NAME_WEIGHT) * (1 - distance / self.radius_m)
+            if score < min_score:
+                continue
+            first, second = self.records[i], self.records[j]
+            pairs.append({
+                'name1': first.get('name'),
+                'slug1': first.get('slug'),
+                'id1': first['id'],
+                'category1': first.get('category'),
+                'name2': second.get('name'),
+                'slug2': second.get('slug'),
+                'id2': second['id'],
+                'category2': second.get('category'),
+                'city': first.get('city'),
+                'country': first.get('country'),
+                'distance_m': round(distance, 1),
+                'name_similarity': name_score,
+                'similarity': score,
+                'source': 'geo',
+            })
+        pairs.sort(key=lambda p: (-p['similarity'], p['id1'], p['id2']))
+        return pairs
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate candidates by location")
+    parser.add_argument('--radius', type=float, default=DEFAULT_RADIUS_M, help="metres")
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE,
+                        help="combined distance + name score a pair needs to be reported")
+    parser.add_argument('--output', default=results_path('geo_duplicate_candidates.json'))
+    args = parser.parse_args()
+
+    print("="*80)
+    print("GEO DUPLICATE SCAN")
+    print("="*80)
+
+    print("\n📊 Loading destinations with coordinates...")
+    destinations = iter_destinations_parallel(
+        get_supabase(), COLUMNS,
+        filters=lambda q: q.not_.is_('latitude', 'null').not_.is_('longitude', 'null'),
+    )
+    started = time.time()
+    index = GeoIndex(destinations, args.radius)
+    print(f"   Indexed {len(index)} destinations in {len(index.cells)} cells")
+
+    print(f"\n📍 Pairing destinations within {args.radius:.0f} m...")
+    pairs = index.candidate_pairs(args.min_score)
+    elapsed = time.time() - started
+
+    report = {
+        'scan_date': date.today().isoformat(),
+        'radius_m': args.radius,
+        'total_destinations': len(index),
+        'pairs': pairs,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"   {len(pairs)} candidate pairs at score ≥{args.min_score} in {elapsed:.1f}s")
+    for pair in pairs[:10]:
+        print(f"   • {pair['name1']} ≈ {pair['name2']} "
+              f"({pair['distance_m']:.0f} m, name {pair['name_similarity']:.0%})")
+    print(f"\n✅ Report saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
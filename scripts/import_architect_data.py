@@ -1,105 +1,115 @@
+import argparse
 import csv
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-load_dotenv('.env.local')
+from clients import get_supabase
+from destination_reader import iter_by_keys
+from destination_writer import DestinationWriter
 
 # --- CONFIGURATION ---
-SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 CSV_FILE_PATH = '/home/ubuntu/upload/TheSpaceManual-Spaces.csv'
-
-# --- Supabase Client Initialization ---
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase client initialized successfully.")
-except Exception as e:
-    print(f"🔥 Error initializing Supabase client: {e}")
-    exit()
+# CSV rows per slug lookup and bulk write
+CHUNK_SIZE = 200
 
 # --- Data Loading and Processing ---
-def get_data_from_csv():
-    """Reads and processes data from the CSV file."""
-    with open(CSV_FILE_PATH, mode='r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        data_to_update = []
-        for row in reader:
-            slug = row.get('Slug')
+def parse_int(value):
+    """int(value), or None for blanks and values that are not whole numbers"""
+    try:
+        return int(value) if value and value.strip() else None
+    except ValueError:
+        return None
+
+def row_to_payload(row):
+    """The columns a CSV row sets; blanks are dropped so they never overwrite data"""
+    update_payload = {
+        "architect": row.get('Architect / Interior', '').strip() or None,
+        "brand": row.get('Brand', '').strip() or None,
+        "year_opened": parse_int(row.get('Year of Opening')),
+        "michelin_stars": parse_int(row.get('Michelin Stars')),
+        "neighborhood": row.get('Location', '').strip() or None,
+        "gallery": [img.strip() for img in row.get('Gallery', '').split(';') if img.strip()] if row.get('Gallery') else None,
+    }
+
+    # Remove None values to avoid overwriting existing data with nulls
+    return {k: v for k, v in update_payload.items() if v is not None}
+
+def iter_csv_chunks(path=CSV_FILE_PATH, chunk_size=CHUNK_SIZE):
+    """Streams the CSV, yielding lists of {slug, payload} of at most chunk_size rows."""
+    with open(path, mode='r', encoding='utf-8') as infile:
+        chunk = []
+        for row in csv.DictReader(infile):
+            slug = (row.get('Slug') or '').strip()
             if not slug:
                 continue
 
-            update_payload = {
-                "architect": row.get('Architect / Interior', '').strip() or None,
-                "brand": row.get('Brand', '').strip() or None,
-                "year_opened": int(row.get('Year of Opening')) if row.get('Year of Opening') else None,
-                "michelin_stars": int(row.get('Michelin Stars')) if row.get('Michelin Stars') else None,
-                "neighborhood": row.get('Location', '').strip() or None,
-                "gallery": [img.strip() for img in row.get('Gallery', '').split(';') if img.strip()] if row.get('Gallery') else None,
-            }
-            
-            # Remove None values to avoid overwriting existing data with nulls
-            update_payload = {k: v for k, v in update_payload.items() if v is not None}
-
+            update_payload = row_to_payload(row)
             if update_payload:
-                data_to_update.append({"slug": slug, "payload": update_payload})
-    return data_to_update
+                chunk.append({"slug": slug, "payload": update_payload})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
-def update_destinations_in_supabase(data):
-    """Updates destinations in Supabase in batches."""
-    updated_count = 0
-    failed_count = 0
+def update_destinations_in_supabase(supabase, chunks):
+    """
+    Updates destinations chunk by chunk: one batched slug -> id lookup and one
+    bulk write per chunk, so memory stays flat however large the CSV is.
+    """
+    def report_failure(row, error):
+        print(f"  - 🔥 FAILED to update {row.get('id')}: {error}")
+
+    processed_count = 0
     skipped_count = 0
-    
-    print(f"\nFound {len(data)} destinations with new data to update.")
-
-    for item in data:
-        slug = item["slug"]
-        payload = item["payload"]
-
-        try:
-            # First, find the destination ID from the slug
-            # This assumes slugs are unique
-            dest_response = supabase.from_('destinations').select('id').eq('slug', slug).execute()
-            
-            if dest_response.data and len(dest_response.data) > 0:
-                destination_id = dest_response.data[0]['id']
-                
-                # Now, update the destination by its ID
-                update_response = supabase.from_('destinations').update(payload).eq('id', destination_id).execute()
-
-                if update_response.data and len(update_response.data) > 0:
-                    print(f"  - ✅ Successfully updated: {slug}")
-                    updated_count += 1
-                else:
-                    print(f"  - 🔥 FAILED to update: {slug}")
-                    failed_count += 1
-            else:
-                print(f"  - ⚠️  SKIPPED: Destination with slug '{slug}' not found in Supabase.")
-                skipped_count += 1
-
-        except Exception as e:
-            print(f"  - 🔥 An unexpected error occurred for slug {slug}: {e}")
-            failed_count += 1
+    lookups = 0
+
+    with DestinationWriter(supabase, key='id', max_rows=CHUNK_SIZE, on_failure=report_failure) as writer:
+        for chunk in chunks:
+            processed_count += len(chunk)
+            slugs = [item["slug"] for item in chunk]
+            ids = {row['slug']: row['id'] for row in iter_by_keys(supabase, 'id, slug', 'slug', slugs)}
+            lookups += 1
+
+            for item in chunk:
+                dest_id = ids.get(item["slug"])
+                if dest_id is None:
+                    print(f"  - ⚠️  SKIPPED: Destination with slug '{item['slug']}' not found in Supabase.")
+                    skipped_count += 1
+                    continue
+                writer.add({"id": dest_id, **item["payload"]})
+            writer.flush()
+            print(f"  📦 {processed_count} rows processed ({writer.updated} updated so far)")
+
+    updated_count = writer.updated
+    failed_count = len(writer.failures)
 
     print("\n" + "="*60)
     print("--- MIGRATION SUMMARY ---")
     print("="*60)
     print(f"✅ Successfully updated destinations: {updated_count}")
-    print(f"⚠️  Skipped (not found in DB): {skipped_count}")
+    print(f"⚠️  Skipped (not found in DB): {skipped_count + len(writer.not_found)}")
     print(f"🔥 Failed to update destinations: {failed_count}")
-    print(f"📊 Total processed: {len(data)}")
+    print(f"📊 Total processed: {processed_count}")
+    print(f"🌐 Requests: {lookups} slug lookups, {writer.batches} bulk writes")
     print("="*60)
+    return processed_count
 
 # --- Main Execution ---
-if __name__ == "__main__":
+def main():
+    argparse.ArgumentParser(description="Import architect, brand and other details from the Space Manual CSV").parse_args()
+
+    try:
+        supabase = get_supabase()
+        print("✅ Supabase client initialized successfully.")
+    except Exception as e:
+        print(f"🔥 Error initializing Supabase client: {e}")
+        return
+
     print("="*60)
     print("Starting data migration from CSV to Supabase...")
     print("="*60)
-    csv_data = get_data_from_csv()
-    if csv_data:
-        update_destinations_in_supabase(csv_data)
-    else:
+    if not update_destinations_in_supabase(supabase, iter_csv_chunks(CSV_FILE_PATH)):
         print("No data to update.")
     print("\nMigration process finished.")
 
+if __name__ == "__main__":
+    main()
+
@@ -2,52 +2,33 @@
 """
 Merge Duplicate Destinations Script
 This script will:
-1. Fetch both entries for each duplicate pair
-2. Merge all information (keeping best data from each)
-3. Update the "keep" entry with merged data
-4. Delete the duplicate entry
+1. Read the merge plan written by duplicate_clusters.py
+2. Fetch every row in the plan with batched id lookups
+3. Merge each cluster's duplicates into its keep entry (keeping the best data)
+4. Send the merges in bulk to bulk_merge_destinations, which updates each keep
+   entry, re-points saved/visited places, list items and list entries from the
+   duplicates to it, and deletes the duplicates in one transaction
+
+Usage:
+    python merge_duplicates.py [--plan merge_plan.json] [--dry-run]
 """
 
+import argparse
 import json
-from supabase import create_client
-from dotenv import load_dotenv
-import os
-
-load_dotenv('.env.local')
-
-# Supabase setup
-url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-supabase = create_client(url, key)
-
-# Define the merges to perform
-MERGES = [
-    {
-        'name': 'The Mark (New York)',
-        'keep_slug': 'the-mark',
-        'delete_slug': 'the-mark-hotel'
-    },
-    {
-        'name': 'Park Hyatt Milano (Milan)',
-        'keep_slug': 'park-hyatt-milano',
-        'delete_slug': 'park-hyatt-milan'
-    },
-    {
-        'name': 'Hotel Higashiyama by Kyoto Tokyu (Kyoto)',
-        'keep_slug': 'hotel-higashiyama-by-kyoto-tokyu',
-        'delete_slug': 'the-hotel-higashiyama-kyoto-tokyu'
-    },
-    {
-        'name': 'La Samaritaine (Paris)',
-        'keep_slug': 'la-samaritaine',
-        'delete_slug': 'samaritaine'
-    },
-    {
-        'name': 'Experimental Marais (Paris)',
-        'keep_slug': 'experimental-marais',
-        'delete_slug': 'hotel-experimental-marais'
-    }
+from clients import get_supabase
+from destination_reader import iter_by_keys
+from destination_writer import DestinationWriter
+from run_journal import results_path
+
+# Fields merged from duplicates into the keep entry
+FIELDS_TO_MERGE = [
+    'name', 'description', 'content', 'image', 'gallery',
+    'architect', 'brand', 'year_opened', 'michelin_stars',
+    'neighborhood', 'category', 'country', 'city'
 ]
+COLUMNS = ', '.join(['id', 'slug'] + FIELDS_TO_MERGE)
+# Clusters per bulk_merge_destinations request
+MERGE_BATCH = 200
 
 def merge_field(keep_value, delete_value, field_name):
     """
@@ -83,172 +64,183 @@ def merge_field(keep_value, delete_value, field_name):
     # Default: keep the keep_value
     return keep_value
 
-def merge_destinations(keep_slug, delete_slug):
+def merge_cluster(keep_entry, delete_entries):
     """
-    Merge two destination entries.
-    Returns the merged data and both original entries.
+    Merge a cluster's duplicates into its keep entry, best-filled first.
+    Returns the fields to update on the keep entry and the changes made.
     """
-    # Fetch both entries
-    keep_response = supabase.table('destinations').select('*').eq('slug', keep_slug).execute()
-    delete_response = supabase.table('destinations').select('*').eq('slug', delete_slug).execute()
-    
-    if not keep_response.data or not delete_response.data:
-        return None, None, None
-    
-    keep_entry = keep_response.data[0]
-    delete_entry = delete_response.data[0]
-    
-    # Fields to merge
-    fields_to_merge = [
-        'name', 'description', 'content', 'image', 'gallery',
-        'architect', 'brand', 'year_opened', 'michelin_stars',
-        'neighborhood', 'category', 'country', 'city'
-    ]
-    
-    # Create merged data
+    merged_entry = dict(keep_entry)
+    for delete_entry in delete_entries:
+        for field in FIELDS_TO_MERGE:
+            merged_entry[field] = merge_field(merged_entry.get(field), delete_entry.get(field), field)
+
     merged_data = {}
     changes_made = []
-    
-    for field in fields_to_merge:
-        keep_value = keep_entry.get(field)
-        delete_value = delete_entry.get(field)
-        
-        merged_value = merge_field(keep_value, delete_value, field)
-        
+    for field in FIELDS_TO_MERGE:
         # Only include if different from current keep_value
-        if merged_value != keep_value:
-            merged_data[field] = merged_value
+        if merged_entry.get(field) != keep_entry.get(field):
+            merged_data[field] = merged_entry[field]
             changes_made.append({
                 'field': field,
-                'old': keep_value,
-                'new': merged_value,
+                'old': keep_entry.get(field),
+                'new': merged_entry[field],
                 'source': 'merged from duplicate'
             })
-    
-    return merged_data, keep_entry, delete_entry, changes_made
 
-print("="*80)
-print("DUPLICATE MERGE SCRIPT")
-print("="*80)
-print(f"\nMerging {len(MERGES)} duplicate pairs...\n")
+    return merged_data, changes_made
 
-merge_results = []
+def main():
+    parser = argparse.ArgumentParser(description="Apply a duplicate merge plan")
+    parser.add_argument('--plan', default=results_path('merge_plan.json'),
+                        help="merge plan from duplicate_clusters.py")
+    parser.add_argument('--dry-run', action='store_true', help="show the merges without writing")
+    args = parser.parse_args()
 
-for merge_config in MERGES:
-    print(f"{'='*80}")
-    print(f"Processing: {merge_config['name']}")
-    print(f"{'='*80}")
-    print(f"  Keep:   {merge_config['keep_slug']}")
-    print(f"  Delete: {merge_config['delete_slug']}\n")
-    
-    # Perform the merge
-    merged_data, keep_entry, delete_entry, changes = merge_destinations(
-        merge_config['keep_slug'],
-        merge_config['delete_slug']
+    supabase = get_supabase()
+
+    print("="*80)
+    print("DUPLICATE MERGE SCRIPT")
+    print("="*80)
+
+    with open(args.plan) as f:
+        plan = json.load(f)
+    clusters = plan['clusters']
+    print(f"\nMerging {len(clusters)} clusters ({plan['total_deletes']} duplicates) from {args.plan}...\n")
+
+    initial_count = supabase.table('destinations').select('id', count='exact').limit(1).execute().count
+
+    # Every row in the plan, fetched in batched id lookups
+    plan_ids = [i for cluster in clusters for i in [cluster['keep_id']] + cluster['delete_ids']]
+    rows = {row['id']: row for row in iter_by_keys(supabase, COLUMNS, 'id', plan_ids)}
+
+    merge_results = []
+    failed_keep_ids = {}
+
+    def report_merge_failure(row, error):
+        failed_keep_ids[row.get('id')] = error
+        print(f"  ❌ ERROR merging into keep entry (ID: {row.get('id')}): {error}")
+
+    # Each cluster is one row of the bulk_merge_destinations RPC: the keep id, the
+    # duplicate ids and the merged fields. The server applies a cluster's update,
+    # re-points saved/visited places, list items and list entries, and deletes the
+    # duplicates in one transaction, a few hundred clusters per request.
+    writer = DestinationWriter(
+        supabase, key='id', max_rows=MERGE_BATCH, rpc='bulk_merge_destinations',
+        on_failure=report_merge_failure,
     )
-    
-    if not keep_entry or not delete_entry:
-        print(f"  ❌ ERROR: Could not find one or both entries!")
-        print(f"     Keep slug found: {keep_entry is not None}")
-        print(f"     Delete slug found: {delete_entry is not None}\n")
-        merge_results.append({
-            'name': merge_config['name'],
-            'status': 'error',
-            'message': 'Entry not found'
-        })
-        continue
-    
-    # Show what will be merged
-    if changes:
-        print(f"  📝 Changes to be made ({len(changes)} fields):")
-        for change in changes:
-            print(f"     • {change['field']}:")
-            print(f"       Old: {str(change['old'])[:60]}...")
-            print(f"       New: {str(change['new'])[:60]}...")
-    else:
-        print(f"  ℹ️  No data to merge (keep entry already has all best data)")
-    
-    # Show what will be preserved from delete entry
-    print(f"\n  🗑️  Entry to be deleted (ID: {delete_entry['id']}):")
-    print(f"     Name: {delete_entry.get('name')}")
-    print(f"     Slug: {delete_entry.get('slug')}")
-    
-    # Update the keep entry if there are changes
-    if merged_data:
-        try:
-            update_response = supabase.table('destinations').update(merged_data).eq('id', keep_entry['id']).execute()
-            print(f"\n  ✅ Updated keep entry (ID: {keep_entry['id']}) with merged data")
-        except Exception as e:
-            print(f"\n  ❌ ERROR updating keep entry: {e}")
+    pending = []
+
+    for cluster in clusters:
+        keep_entry = rows.get(cluster['keep_id'])
+        delete_entries = [rows[i] for i in cluster['delete_ids'] if i in rows]
+
+        print(f"{'='*80}")
+        print(f"Processing: {cluster['name']} ({cluster['city']})")
+        print(f"{'='*80}")
+        print(f"  Keep:   {cluster['keep_slug']}")
+        print(f"  Delete: {', '.join(cluster['delete_slugs'])}\n")
+
+        if not keep_entry or not delete_entries:
+            print(f"  ❌ ERROR: Could not find the keep entry or any duplicate!")
+            print(f"     Keep slug found: {keep_entry is not None}")
+            print(f"     Duplicates found: {len(delete_entries)}\n")
             merge_results.append({
-                'name': merge_config['name'],
+                'name': cluster['name'],
                 'status': 'error',
-                'message': f'Update failed: {e}'
+                'message': 'Entry not found'
+            })
+            continue
+
+        merged_data, changes = merge_cluster(keep_entry, delete_entries)
+
+        # Show what will be merged
+        if changes:
+            print(f"  📝 Changes to be made ({len(changes)} fields):")
+            for change in changes:
+                print(f"     • {change['field']}:")
+                print(f"       Old: {str(change['old'])[:60]}...")
+                print(f"       New: {str(change['new'])[:60]}...")
+        else:
+            print(f"  ℹ️  No data to merge (keep entry already has all best data)")
+
+        for delete_entry in delete_entries:
+            print(f"  🗑️  To delete (ID: {delete_entry['id']}): {delete_entry.get('name')} [{delete_entry.get('slug')}]")
+        print()
+
+        if not args.dry_run:
+            writer.add({
+                'id': keep_entry['id'],
+                'merge_ids': [d['id'] for d in delete_entries],
+                **merged_data,
+            })
+        pending.append((cluster, keep_entry, delete_entries, changes))
+
+    writer.close()
+    not_found = set(writer.not_found)
+
+    for cluster, keep_entry, delete_entries, changes in pending:
+        if keep_entry['id'] in failed_keep_ids or str(keep_entry['id']) in not_found:
+            merge_results.append({
+                'name': cluster['name'],
+                'status': 'error',
+                'message': failed_keep_ids.get(keep_entry['id'], 'Keep entry no longer exists')
             })
             continue
-    else:
-        print(f"\n  ℹ️  No update needed for keep entry")
-    
-    # Delete the duplicate entry
-    try:
-        delete_response = supabase.table('destinations').delete().eq('id', delete_entry['id']).execute()
-        print(f"  ✅ Deleted duplicate entry (ID: {delete_entry['id']})")
-        
         merge_results.append({
-            'name': merge_config['name'],
+            'name': cluster['name'],
             'keep_id': keep_entry['id'],
             'keep_slug': keep_entry['slug'],
-            'deleted_id': delete_entry['id'],
-            'deleted_slug': delete_entry['slug'],
+            'deleted_ids': [d['id'] for d in delete_entries],
+            'deleted_slugs': [d['slug'] for d in delete_entries],
             'fields_merged': len(changes),
-            'status': 'success'
-        })
-    except Exception as e:
-        print(f"  ❌ ERROR deleting duplicate: {e}")
-        merge_results.append({
-            'name': merge_config['name'],
-            'status': 'error',
-            'message': f'Delete failed: {e}'
+            'status': 'dry-run' if args.dry_run else 'success'
         })
-    
-    print()
 
-# Final summary
-print("="*80)
-print("MERGE COMPLETE!")
-print("="*80)
-
-successful = [r for r in merge_results if r.get('status') == 'success']
-failed = [r for r in merge_results if r.get('status') == 'error']
-
-print(f"\n✅ Successfully merged: {len(successful)}")
-print(f"❌ Failed: {len(failed)}\n")
-
-if successful:
-    print("Successful merges:")
-    for result in successful:
-        print(f"  • {result['name']}")
-        print(f"    Kept: {result['keep_slug']} (ID: {result['keep_id']})")
-        print(f"    Deleted: {result['deleted_slug']} (ID: {result['deleted_id']})")
-        print(f"    Fields merged: {result['fields_merged']}")
+    if not args.dry_run:
+        print(f"✅ Merged {writer.updated} clusters in {writer.batches} requests "
+              f"({writer.bytes_sent / 1024:.1f} KB)\n")
+
+    # Final summary
+    print("="*80)
+    print("MERGE COMPLETE!" if not args.dry_run else "DRY RUN COMPLETE (nothing written)")
+    print("="*80)
+
+    successful = [r for r in merge_results if r.get('status') in ('success', 'dry-run')]
+    failed = [r for r in merge_results if r.get('status') == 'error']
+
+    print(f"\n✅ Successfully merged: {len(successful)}")
+    print(f"❌ Failed: {len(failed)}\n")
+
+    if successful:
+        print("Successful merges:")
+        for result in successful:
+            print(f"  • {result['name']}")
+            print(f"    Kept: {result['keep_slug']} (ID: {result['keep_id']})")
+            print(f"    Deleted: {', '.join(result['deleted_slugs'])} (IDs: {result['deleted_ids']})")
+            print(f"    Fields merged: {result['fields_merged']}")
+            print()
+
+    if failed:
+        print("Failed merges:")
+        for result in failed:
+            print(f"  • {result['name']}: {result['message']}")
         print()
 
-if failed:
-    print("Failed merges:")
-    for result in failed:
-        print(f"  • {result['name']}: {result['message']}")
-    print()
+    # Save results
+    results_file = results_path('merge_results.json')
+    with open(results_file, 'w') as f:
+        json.dump(merge_results, f, indent=2)
 
-# Save results
-with open('/home/ubuntu/urban-manual/merge_results.json', 'w') as f:
-    json.dump(merge_results, f, indent=2)
+    print(f"📁 Results saved to: {results_file}")
+    print("="*80)
 
-print(f"📁 Results saved to: /home/ubuntu/urban-manual/merge_results.json")
-print("="*80)
+    # Verify final count
+    final_count = supabase.table('destinations').select('id', count='exact').limit(1).execute()
+    expected = initial_count - sum(len(r['deleted_ids']) for r in merge_results if r.get('status') == 'success')
+    print(f"\n📊 Total destinations after merge: {final_count.count}")
+    print(f"   (Should be {expected} if all merges succeeded)")
+    print()
 
-# Verify final count
-final_count = supabase.table('destinations').select('id', count='exact').execute()
-print(f"\n📊 Total destinations after merge: {final_count.count}")
-print(f"   (Should be {924 - len(successful)} if all merges succeeded)")
-print()
 
+if __name__ == '__main__':
+    main()
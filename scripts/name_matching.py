@@ -0,0 +1,139 @@
+"""
+Name matching between partner CSVs and the destinations catalog.
+
+Comparing every CSV row with every destination is O(N*M) SequenceMatcher
+calls. NameIndex normalizes each catalog name once and keeps, per city,
+postings from each character to the names containing it and how often. A
+lookup sums min(query count, name count) over those postings, which is the
+bound SequenceMatcher.quick_ratio() computes: no name can score above
+2 * shared / (len(query) + len(name)). Names are scored in descending bound
+order and the scan stops once no remaining bound can reach min_score or the
+best score so far, so results are exactly what the brute-force loop
+produced, with far fewer full ratio() calls.
+
+Usage:
+    index = NameIndex(destinations)              # dicts with name, city
+    match, score = index.best_match('Aman Tokyo', 'tokyo', min_score=0.7)
+"""
+
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Lowest similarity duplicate_scanner.py reports, and the confidence bucket
+# each similarity falls in (also read by duplicate_clusters.py)
+MIN_SIMILARITY = 0.7
+BUCKETS = [
+    ('very_high_confidence', 0.95),
+    ('high_confidence', 0.9),
+    ('medium_confidence', 0.8),
+    ('low_confidence', MIN_SIMILARITY),
+]
+
+def normalize_name(name):
+    """Normalize name for comparison"""
+    if not name:
+        return ""
+    name = name.lower().strip()
+    name = name.replace('the ', '').replace(' hotel', '').replace(' restaurant', '')
+    name = name.replace('&', 'and').replace('-', ' ')
+    return name
+
+
+def similarity(a, b):
+    """Calculate similarity ratio between two strings"""
+    if not a or not b:
+        return 0
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+class _Partition:
+    """Normalized names of one city, with per-character count postings"""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+        self.names: List[str] = []
+        # One matcher per name with the name as seq2, whose analysis
+        # SequenceMatcher caches; lookups only swap in the query as seq1
+        self.matchers: List[SequenceMatcher] = []
+        self.chars: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def add(self, record: Dict, name: str):
+        position = len(self.records)
+        self.records.append(record)
+        self.names.append(name)
+        self.matchers.append(SequenceMatcher(None, '', name))
+        for char, count in Counter(name).items():
+            self.chars[char].append((position, count))
+
+    def bounds(self, name: str) -> List[Tuple[float, int]]:
+        """(quick_ratio bound, position) of every name sharing a character, best first"""
+        shared: Dict[int, int] = defaultdict(int)
+        for char, count in Counter(name).items():
+            for position, other in self.chars.get(char, ()):
+                shared[position] += min(count, other)
+        length = len(name)
+        ranked = [
+            (2.0 * matches / (length + len(self.names[position])), position)
+            for position, matches in shared.items()
+        ]
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+
+class NameIndex:
+    """City-partitioned index over normalized destination names"""
+
+    def __init__(
+        self,
+        records: Iterable[Dict],
+        name_key: str = 'name',
+        city_key: str = 'city',
+    ):
+        self.partitions: Dict[str, _Partition] = defaultdict(_Partition)
+        for record in records:
+            name = normalize_name(record.get(name_key))
+            if name:
+                self.partitions[record.get(city_key) or ''].add(record, name)
+        self.comparisons = 0
+
+    def best_match(self, name: str, city: str, min_score: float = 0.0) -> Tuple[Optional[Dict], float]:
+        """
+        The most similar record in city and its score, or (None, 0) if no
+        record reaches min_score. Ties go to the record seen first.
+        """
+        partition = self.partitions.get(city or '')
+        query = normalize_name(name)
+        if partition is None or not query:
+            return None, 0
+
+        # Scored as similarity(query, name), the order the brute-force loop used
+        best, best_score, best_position = None, 0.0, -1
+        for bound, position in partition.bounds(query):
+            # Bounds only fall from here; a tie can still win if seen earlier
+            if bound < min_score or bound < best_score:
+                break
+            matcher = partition.matchers[position]
+            matcher.set_seq1(query)
+            self.comparisons += 1
+            score = matcher.ratio()
+            if score < min_score or score == 0:
+                continue
+            if score > best_score or (score == best_score and position < best_position):
+                best, best_score, best_position = partition.records[position], score, position
+        return best, best_score
+    def match_all(
+        self,
+        rows: Iterable[Dict],
+        name_key: str,
+        city_key: str,
+        min_score: float = 0.0,
+    ) -> List[Tuple[Dict, Optional[Dict], float]]:
+        """best_match() for every row: [(row, matched record or None, score)]"""
+        results = []
+        for row in rows:
+            match, score = self.best_match(
+                (row.get(name_key) or '').strip(), (row.get(city_key) or '').strip(), min_score
+            )
+            results.append((row, match, score))
+        return results
@@ -0,0 +1,369 @@
+"""
+Streaming DAG runner for per-destination stages.
+
+Each Stage has a bounded inbox and its own worker threads. Workers take up to
+batch_size destinations (or whatever arrived within max_wait seconds), run
+the stage on them and pass each one on to the stages declared `after` it, so
+a destination moves to the next stage as soon as its own batch is done, not
+when the whole catalog has been through the previous one. Full inboxes block
+their upstream, which keeps memory flat and lets the slowest stage set the
+pace; total wall time is roughly that stage's time, not the sum of all of
+them.
+
+A stage's `process(batch)` gets the destination dicts, may update them in
+place (downstream stages see the new values) and returns {id: error} for the
+ones that failed. A destination that failed, or whose upstream failed, is
+not processed by any stage after it, but still flows through so stages that
+join several upstreams can settle. `wants(dest)` lets a stage pass over
+destinations it has nothing to do for.
+
+A stage with several upstreams (after=('a', 'b')) sees each destination once,
+after all of them have handled it. A destination that one upstream never
+passed on (its worker crashed) is released as blocked once every upstream
+has finished, so the join table does not keep it for the rest of the run.
+
+A worker that crashes outside `process` (in `wants`, a callback, ...) fails
+the batch it had. If every worker of a stage is gone, the last one keeps
+draining the inbox, failing each destination and passing it on blocked, so
+upstream stages are never left waiting on a full inbox.
+
+Usage:
+    pipeline = Pipeline([
+        Stage('places', fetch_places, concurrency=1, batch_size=200),
+        Stage('ai_fields', generate, concurrency=4, batch_size=10),
+        Stage('embeddings', embed, after=('ai_fields',), batch_size=100),
+    ])
+    stats = pipeline.run(iter_destinations_parallel(supabase, columns))
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# process(batch) -> {id: error} for the destinations that failed (None = all ok)
+ProcessFn = Callable[[List[Dict]], Optional[Dict]]
+# wants(dest) -> False to pass dest through untouched
+WantsFn = Callable[[Dict], bool]
+# teardown() runs in each worker thread as it exits, to close per-worker resources
+TeardownFn = Callable[[], None]
+# on_failure(stage name, dest, error)
+FailureCallback = Callable[[str, Dict, str], None]
+
+_DONE = object()
+
+
+class _Item:
+    """A destination on one edge of the graph"""
+
+    __slots__ = ('dest', 'blocked')
+
+    def __init__(self, dest: Dict, blocked: bool = False):
+        self.dest = dest
+        self.blocked = blocked
+
+
+class Stage:
+    """One step of the pipeline and its concurrency/batching budget"""
+
+    def __init__(
+        self,
+        name: str,
+        process: ProcessFn,
+        after: Sequence[str] = (),
+        concurrency: int = 1,
+        batch_size: int = 1,
+        max_wait: float = 2.0,
+        queue_size: Optional[int] = None,
+        wants: Optional[WantsFn] = None,
+        teardown: Optional[TeardownFn] = None,
+    ):
+        if concurrency < 1 or batch_size < 1:
+            raise ValueError(f"stage {name}: concurrency and batch_size must be at least 1")
+        self.name = name
+        self.process = process
+        self.after = tuple(after)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue_size = queue_size or 2 * concurrency * batch_size
+        self.wants = wants
+        self.teardown = teardown
+
+
+class _StageRunner:
+    """Inbox, workers and counters of one stage during a run"""
+
+    def __init__(self, stage: Stage, upstreams: int, on_failure: Optional[FailureCallback]):
+        self.stage = stage
+        self.inbox: queue.Queue = queue.Queue(maxsize=stage.queue_size)
+        self.downstream: List['_StageRunner'] = []
+        self.on_failure = on_failure
+        self.stats = {
+            'received': 0, 'processed': 0, 'failed': 0, 'skipped': 0,
+            'blocked': 0, 'batches': 0, 'busy_seconds': 0.0, 'crashed_workers': 0,
+        }
+
+        self._lock = threading.Lock()
+        self._upstreams = upstreams
+        self._upstreams_done = 0
+        self._workers_left = stage.concurrency
+        # Joins: id -> [upstreams that delivered it, blocked by any of them, dest]
+        self._arrivals: Dict[object, list] = {}
+        self.threads = [
+            threading.Thread(target=self._work, name=f"{stage.name}-{i}", daemon=True)
+            for i in range(stage.concurrency)
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def deliver(self, item: _Item, sender: str):
+        """Called by each upstream; blocks while the inbox is full"""
+        if self._upstreams > 1:
+            key = item.dest['id']
+            with self._lock:
+                arrival = self._arrivals.setdefault(key, [set(), False, item.dest])
+                arrival[0].add(sender)
+                arrival[1] = arrival[1] or item.blocked
+                if len(arrival[0]) < self._upstreams:
+                    return
+                del self._arrivals[key]
+            item = _Item(item.dest, arrival[1])
+        self.inbox.put(item)
+
+    def upstream_done(self):
+        with self._lock:
+            self._upstreams_done += 1
+            finished = self._upstreams_done == self._upstreams
+            # Every upstream has reported: nothing else will arrive for these
+            leftovers = list(self._arrivals.values()) if finished else []
+            if finished:
+                self._arrivals.clear()
+        for _, _, dest in leftovers:
+            self.inbox.put(_Item(dest, blocked=True))
+        if finished:
+            for _ in self.threads:
+                self.inbox.put(_DONE)
+
+    def _next_batch(self) -> Tuple[List[_Item], bool]:
+        """Up to batch_size items, waiting at most max_wait after the first"""
+        first = self.inbox.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.stage.max_wait
+        while len(batch) < self.stage.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.inbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self):
+        crashed = False
+        batch: List[_Item] = []
+        try:
+            done = False
+            while not done:
+                batch, done = self._next_batch()
+                if batch:
+                    self._run_batch(batch)
+        except Exception as e:
+            crashed = True
+            error = f"worker crashed: {type(e).__name__}: {e}"
+            print(f"  ❌ [{self.stage.name}] {threading.current_thread().name} {error}")
+            # The batch may be partly passed on already, so it is only reported
+            self._fail(batch, error)
+        finally:
+            if self.stage.teardown:
+                try:
+                    self.stage.teardown()
+                except Exception as e:
+                    print(f"  ⚠️  [{self.stage.name}] teardown failed: {type(e).__name__}: {e}")
+            with self._lock:
+                self._workers_left -= 1
+                last = self._workers_left == 0
+                if crashed:
+                    self.stats['crashed_workers'] += 1
+            if last:
+                if crashed:
+                    self._drain()
+                for runner in self.downstream:
+                    runner.upstream_done()
+
+    def _fail(self, batch: List[_Item], error: str):
+        """Count and report destinations the stage could not handle"""
+        failed = [item for item in batch if not item.blocked]
+        with self._lock:
+            self.stats['received'] += len(batch)
+            self.stats['failed'] += len(failed)
+            self.stats['blocked'] += len(batch) - len(failed)
+        for item in failed:
+            item.blocked = True
+            if self.on_failure:
+                try:
+                    self.on_failure(self.stage.name, item.dest, error)
+                except Exception:
+                    pass
+
+    def _drain(self):
+        """No workers left: fail whatever arrives until every upstream is done"""
+        while True:
+            try:
+                item = self.inbox.get(timeout=0.5)
+            except queue.Empty:
+                with self._lock:
+                    finished = self._upstreams_done == self._upstreams
+                if finished and self.inbox.empty():
+                    return
+                continue
+            if item is _DONE:
+                continue
+            self._fail([item], "no workers left in stage")
+            for runner in self.downstream:
+                runner.deliver(_Item(item.dest, True), self.stage.name)
+
+    def _run_batch(self, batch: List[_Item]):
+        stage = self.stage
+        blocked = sum(1 for item in batch if item.blocked)
+        work = [
+            item for item in batch
+            if not item.blocked and (stage.wants is None or stage.wants(item.dest))
+        ]
+
+        failures: Dict = {}
+        started = time.monotonic()
+        if work:
+            try:
+                failures = stage.process([item.dest for item in work]) or {}
+            except Exception as e:
+                failures = {item.dest['id']: f"{type(e).__name__}: {e}" for item in work}
+        busy = time.monotonic() - started
+
+        failed = 0
+        for item in work:
+            error = failures.get(item.dest['id'])
+            if error is not None:
+                failed += 1
+                item.blocked = True
+                if self.on_failure:
+                    self.on_failure(stage.name, item.dest, error)
+
+        with self._lock:
+            self.stats['received'] += len(batch)
+            self.stats['processed'] += len(work) - failed
+            self.stats['failed'] += failed
+            self.stats['blocked'] += blocked
+            self.stats['skipped'] += len(batch) - len(work) - blocked
+            if work:
+                self.stats['batches'] += 1
+            self.stats['busy_seconds'] += busy
+
+        for item in batch:
+            for runner in self.downstream:
+                runner.deliver(_Item(item.dest, item.blocked), stage.name)
+
+
+class Pipeline:
+    """A DAG of stages that destinations stream through"""
+
+    def __init__(self, stages: Sequence[Stage], on_failure: Optional[FailureCallback] = None):
+        self.stages = _topological_order(stages)
+        self.on_failure = on_failure
+        self.runners: Dict[str, _StageRunner] = {}
+
+    def run(self, source: Iterable[Dict], progress_every: Optional[float] = 30.0) -> Dict[str, Dict]:
+        """
+        Stream every destination from source through the stages. Returns
+        per-stage counters: received, processed, failed, skipped (not
+        wanted), blocked (an upstream failed), batches, busy_seconds,
+        crashed_workers.
+        """
+        runners = {}
+        for stage in self.stages:
+            runners[stage.name] = _StageRunner(stage, max(1, len(stage.after)), self.on_failure)
+            for upstream in stage.after:
+                runners[upstream].downstream.append(runners[stage.name])
+        self.runners = runners
+        roots = [runners[s.name] for s in self.stages if not s.after]
+
+        for runner in runners.values():
+            runner.start()
+
+        started = time.monotonic()
+        feeder = threading.Thread(target=self._feed, args=(source, roots), name='source', daemon=True)
+        self._source_error: Optional[BaseException] = None
+        feeder.start()
+
+        threads = [feeder] + [t for runner in runners.values() for t in runner.threads]
+        last_report = time.monotonic()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1.0)
+                if progress_every and time.monotonic() - last_report >= progress_every:
+                    last_report = time.monotonic()
+                    self.print_progress(time.monotonic() - started)
+
+        if self._source_error is not None:
+            raise self._source_error
+        return self.stats()
+
+    def _feed(self, source: Iterable[Dict], roots: List[_StageRunner]):
+        try:
+            for dest in source:
+                for runner in roots:
+                    runner.deliver(_Item(dest), 'source')
+        except BaseException as e:
+            self._source_error = e
+        finally:
+            for runner in roots:
+                runner.upstream_done()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: dict(runner.stats) for name, runner in self.runners.items()}
+
+    def print_progress(self, elapsed: float):
+        parts = []
+        for name, runner in self.runners.items():
+            stats = runner.stats
+            parts.append(f"{name} {stats['processed']}✓ {stats['failed']}✗ (queue {runner.inbox.qsize()})")
+        print(f"📊 {elapsed/60:.1f} min: " + " | ".join(parts))
+
+
+def _topological_order(stages: Sequence[Stage]) -> List[Stage]:
+    """Stages ordered so every stage comes after its upstreams; rejects cycles"""
+    by_name: Dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for upstream in stage.after:
+            if upstream not in by_name:
+                raise ValueError(f"stage {stage.name} runs after unknown stage {upstream}")
+
+    ordered: List[Stage] = []
+    state: Dict[str, str] = {}
+
+    def visit(stage: Stage, path: List[str]):
+        if state.get(stage.name) == 'done':
+            return
+        if state.get(stage.name) == 'visiting':
+            raise ValueError(f"stages form a cycle: {' -> '.join(path + [stage.name])}")
+        state[stage.name] = 'visiting'
+        for upstream in stage.after:
+            visit(by_name[upstream], path + [stage.name])
+        state[stage.name] = 'done'
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage, [])
+    return ordered
@@ -0,0 +1,176 @@
+"""
+Persistent on-disk cache for Google Place Details responses.
+
+fetch_google_types.py and fetch_missing_google_data.py ask for the same
+google_place_ids, and duplicate destinations share place ids, so raw results
+are kept in a local SQLite file keyed by place_id. Each entry remembers which
+fields were requested, which lets a request for a subset (e.g. `types`) be
+answered from an entry fetched with the full FIELDS list. Entries expire after
+their TTL, and the least recently used entries are evicted once the cache
+grows past max_bytes.
+
+SQLite runs in WAL mode, so two scripts can share one cache file.
+
+Usage:
+    cache = PlacesCache()
+    result = cache.get(place_id, ['types'])
+    if result is None:
+        result = fetch(...)
+        cache.put(place_id, ['types'], result)
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.environ.get(
+    'PLACES_CACHE_PATH', os.path.join(REPO_ROOT, '.cache', 'places_details.sqlite')
+)
+DEFAULT_TTL = float(os.environ.get('PLACES_CACHE_TTL_DAYS', '30')) * 86400
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS place_details (
+    place_id    TEXT PRIMARY KEY,
+    fields      TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    fetched_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_place_details_last_access ON place_details(last_access);
+"""
+
+
+def _top_level(field: str) -> str:
+    # 'geometry/location' is part of the 'geometry' object
+    return field.split('/', 1)[0]
+
+
+def covers(cached_fields: Iterable[str], requested: Iterable[str]) -> bool:
+    """True if every requested field, or its parent object, was cached"""
+    cached = set(cached_fields)
+    return all(f in cached or _top_level(f) in cached for f in requested)
+
+
+class PlacesCache:
+    """SQLite-backed Place Details cache with per-entry TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        # Running upper bound on the cache size, so puts don't SUM() every time
+        self._approx_size = self.size_bytes()
+
+    def close(self):
+        self._db.close()
+
+    def get(self, place_id: str, fields: List[str]) -> Optional[Dict]:
+        """Return the cached result restricted to `fields`, or None on a miss"""
+        now = time.time()
+        row = self._db.execute(
+            'SELECT fields, result FROM place_details WHERE place_id = ? AND expires_at > ?',
+            (place_id, now),
+        ).fetchone()
+
+        if row is None or not covers(row[0].split(','), fields):
+            self.misses += 1
+            return None
+
+        with self._db:
+            self._db.execute(
+                'UPDATE place_details SET last_access = ? WHERE place_id = ?', (now, place_id)
+            )
+        self.hits += 1
+        wanted = {_top_level(f) for f in fields}
+        return {k: v for k, v in json.loads(row[1]).items() if k in wanted}
+
+    def put(self, place_id: str, fields: List[str], result: Dict, ttl: Optional[float] = None):
+        """
+        Store a result fetched with `fields`.
+
+        A fresh entry for the same place is merged rather than replaced, so
+        the cached field set only grows. The merged entry keeps the earlier
+        expiry, since part of it is that old.
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        field_set = set(fields)
+        merged = dict(result)
+
+        existing = self._db.execute(
+            'SELECT fields, result, expires_at FROM place_details WHERE place_id = ? AND expires_at > ?',
+            (place_id, now),
+        ).fetchone()
+        if existing:
+            old_fields = set(existing[0].split(','))
+            if not covers(field_set, old_fields):
+                field_set |= old_fields
+                merged = {**json.loads(existing[1]), **result}
+                expires_at = min(expires_at, existing[2])
+
+        payload = json.dumps(merged, separators=(',', ':'))
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO place_details '
+                '(place_id, fields, result, size, fetched_at, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (place_id, ','.join(sorted(field_set)), payload, len(payload), now, expires_at, now),
+            )
+        self._approx_size += len(payload)
+        self._evict()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries. Returns how many were removed."""
+        with self._db:
+            return self._db.execute(
+                'DELETE FROM place_details WHERE expires_at <= ?', (time.time(),)
+            ).rowcount
+
+    def size_bytes(self) -> int:
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM place_details').fetchone()[0]
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones, down to 90% of max_bytes"""
+        if self._approx_size <= self.max_bytes:
+            return
+        total = self._approx_size = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+
+        self.purge_expired()
+        total = self._approx_size = self.size_bytes()
+        target = int(self.max_bytes * 0.9)
+        if total <= target:
+            return
+
+        doomed = []
+        for place_id, size in self._db.execute(
+            'SELECT place_id, size FROM place_details ORDER BY last_access'
+        ):
+            if total <= target:
+                break
+            doomed.append((place_id,))
+            total -= size
+        with self._db:
+            self._db.executemany('DELETE FROM place_details WHERE place_id = ?', doomed)
+        self._approx_size = total
@@ -0,0 +1,260 @@
+"""
+Async Google Places Details fetcher.
+
+Replaces the serial `requests.get` + `time.sleep(0.11)` loops with an asyncio
+engine: one pooled aiohttp session reuses keep-alive connections, every
+request has a timeout, and a RateController keeps the run under the QPS
+ceiling (shared with any other script using Places at the same time) while
+adapting how many of up to `concurrency` requests are in flight to 429s,
+OVER_QUERY_LIMIT and latency. Parsed rows flow through a
+bounded queue into a DestinationWriter, so writes overlap with fetching and
+memory stays flat.
+
+With a PlacesCache, fresh cached results are served without a request, and
+destinations sharing a place id within a run only trigger one request.
+
+Long-running callers can keep one PlacesFetcher (and its session) open and
+pass it to refresh_places() for every batch, with the process-wide
+controller from clients.rate_controller('places', ...).
+
+Usage:
+    stats = run_places_refresh(
+        places_api_key(), destinations, fields=['types'],
+        to_row=lambda dest, result: {'id': dest['id'], 'tags': result.get('types')},
+        writer=writer, concurrency=16, qps=50,
+    )
+"""
+
+import asyncio
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from rate_controller import RateController
+
+PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_QPS = 50.0
+DEFAULT_TIMEOUT = 10.0  # seconds, per request
+DEFAULT_RETRIES = 3
+
+# Statuses worth retrying; everything else (NOT_FOUND, INVALID_REQUEST, ...) is final
+RETRY_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+# to_row(destination, place result) -> row for the writer, or None to skip
+RowBuilder = Callable[[Dict, Dict], Optional[Dict]]
+# on_error(destination, reason)
+ErrorCallback = Callable[[Dict, str], None]
+# on_fetched(destination, seconds spent fetching it)
+FetchedCallback = Callable[[Dict, float], None]
+
+
+class PlacesError(Exception):
+    """A Place Details request that failed for good"""
+
+    def __init__(self, status: str, message: str = ''):
+        super().__init__(f"{status} - {message}" if message else status)
+        self.status = status
+
+
+class PlacesFetcher:
+    """Pooled, rate-limited Place Details client. Use as an async context manager."""
+
+    def __init__(
+        self,
+        api_key: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        qps: float = DEFAULT_QPS,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        cache=None,
+        rate: Optional[RateController] = None,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        # A controller passed in is shared with other fetchers and left open
+        self._owns_rate = rate is None
+        self.rate = rate or RateController('places', rate=qps, max_concurrency=concurrency)
+        self.requests_made = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        if self._owns_rate:
+            self.rate.close()
+
+    async def fetch_details(self, place_id: str, fields: List[str]) -> Dict:
+        """Return the `result` object for place_id, or raise PlacesError"""
+        if self.cache is not None:
+            cached = self.cache.get(place_id, fields)
+            if cached is not None:
+                return cached
+
+        # Share one request between concurrent callers asking for the same thing
+        key = (place_id, tuple(sorted(fields)))
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._request(place_id, fields)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            if self.cache is not None:
+                self.cache.put(place_id, fields, result)
+            return result
+        finally:
+            del self._inflight[key]
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    async def _request(self, place_id: str, fields: List[str]) -> Dict:
+        params = {
+            'place_id': place_id,
+            'fields': ','.join(fields),
+            'key': self.api_key,
+        }
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with self.rate.async_slot() as call:
+                    self.requests_made += 1
+                    try:
+                        async with self._session.get(PLACE_DETAILS_URL, params=params) as response:
+                            if response.status == 429 or response.status >= 500:
+                                status, message = f"HTTP {response.status}", ''
+                                if response.status == 429:
+                                    call.throttled(response.headers.get('Retry-After'))
+                            else:
+                                data = await response.json(content_type=None)
+                                status = data.get('status')
+                                if status == 'OK':
+                                    return data.get('result', {})
+                                message = data.get('error_message', '')
+                                if status == 'OVER_QUERY_LIMIT':
+                                    call.throttled()
+                                elif status not in RETRY_STATUSES:
+                                    raise PlacesError(status, message)
+                    except asyncio.TimeoutError:
+                        call.timed_out()
+                        raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, message = type(e).__name__, str(e)
+
+            if last_attempt:
+                raise PlacesError(status, message)
+            # Exponential backoff with jitter before retrying
+            await asyncio.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+
+        raise PlacesError('UNREACHABLE')
+
+
+async def refresh_places(
+    api_key: str,
+    destinations: Iterable[Dict],
+    fields: List[str],
+    to_row: RowBuilder,
+    writer,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    qps: float = DEFAULT_QPS,
+    timeout: float = DEFAULT_TIMEOUT,
+    queue_size: int = 1000,
+    on_error: Optional[ErrorCallback] = None,
+    fields_for: Optional[Callable[[Dict], List[str]]] = None,
+    cache=None,
+    on_fetched: Optional[FetchedCallback] = None,
+    fetcher: Optional[PlacesFetcher] = None,
+) -> Dict[str, int]:
+    """
+    Fetch Place Details for every destination with a google_place_id and
+    stream the rows built by to_row into writer.
+
+    `fields_for(dest)`, when given, overrides `fields` per destination. An
+    open `fetcher` is used as is (and left open); otherwise one is created
+    for this call from concurrency, qps, timeout and cache.
+    Returns counters: fetched, failed, skipped, queued, requests.
+    """
+    stats = {'fetched': 0, 'failed': 0, 'skipped': 0, 'queued': 0}
+    rows: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    pending = iter(destinations)
+
+    async def fetch_worker(fetcher: PlacesFetcher):
+        # Workers share one iterator; asyncio is single-threaded so next() is safe
+        for dest in pending:
+            place_id = dest.get('google_place_id')
+            if not place_id:
+                stats['skipped'] += 1
+                continue
+            started = time.monotonic()
+            try:
+                result = await fetcher.fetch_details(
+                    place_id, fields_for(dest) if fields_for else fields
+                )
+            except PlacesError as e:
+                stats['failed'] += 1
+                if on_error:
+                    on_error(dest, str(e))
+                continue
+
+            stats['fetched'] += 1
+            if on_fetched:
+                on_fetched(dest, time.monotonic() - started)
+            row = to_row(dest, result)
+            if row:
+                await rows.put(row)
+
+    async def write_worker():
+        while True:
+            row = await rows.get()
+            if row is None:
+                return
+            # Writer flushes are blocking HTTP calls; keep them off the event loop
+            await asyncio.to_thread(writer.add, row)
+            stats['queued'] += 1
+
+    async def run(fetcher: PlacesFetcher):
+        writer_task = asyncio.create_task(write_worker())
+        await asyncio.gather(*(fetch_worker(fetcher) for _ in range(concurrency)))
+        await rows.put(None)
+        await writer_task
+
+    if fetcher is not None:
+        requests_before = fetcher.requests_made
+        await run(fetcher)
+        stats['requests'] = fetcher.requests_made - requests_before
+    else:
+        async with PlacesFetcher(api_key, concurrency, qps, timeout, cache=cache) as fetcher:
+            await run(fetcher)
+        stats['requests'] = fetcher.requests_made
+
+    await asyncio.to_thread(writer.flush)
+    return stats
+
+
+def run_places_refresh(*args, **kwargs) -> Dict[str, int]:
+    """Synchronous wrapper around refresh_places() for the scripts"""
+    return asyncio.run(refresh_places(*args, **kwargs))
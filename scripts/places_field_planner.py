@@ -0,0 +1,289 @@
+"""
+Delta-aware Place Details field planner.
+
+Works out, per destination, which columns are missing or stale and maps them
+to the Place Details fields that fill them, so a refresh only asks Google for
+what it needs. Heavy fields (reviews, opening_hours) and fields nothing reads
+(photos) stop being downloaded for every row, which cuts both payload bytes
+and billed SKUs.
+
+Destinations are grouped by the exact field set they need, and `report()`
+gives a dry-run summary: calls, expected payload size and cost, next to what
+fetching the full field list for everyone would have cost.
+
+Usage:
+    plan = plan_fields(destinations, refresh_days=30)
+    plan.print_report()
+    fields = plan.fields_for(dest)
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+# Destination column -> Place Details field that fills it
+# (mirrors extract_data_for_update() below)
+COLUMN_FIELDS = {
+    'rating': 'rating',
+    'user_ratings_total': 'user_ratings_total',
+    'price_level': 'price_level',
+    'formatted_address': 'formatted_address',
+    'phone_number': 'formatted_phone_number',
+    'international_phone_number': 'international_phone_number',
+    'website': 'website',
+    'opening_hours_json': 'opening_hours',
+    'latitude': 'geometry',
+    'longitude': 'geometry',
+    'plus_code': 'plus_code',
+    'tags': 'types',
+    'reviews_json': 'reviews',
+    'ai_summary': 'editorial_summary',
+}
+
+# Columns that drift over time and are refetched once last_enriched_at is old,
+# even when present. Everything else is only fetched while missing; a column
+# still missing after a recent enrichment is one Google has no data for, so it
+# waits for the next refresh window instead of being re-requested every run.
+VOLATILE_COLUMNS = {'rating', 'user_ratings_total', 'opening_hours_json', 'reviews_json'}
+
+# Columns the planner reads; select these (plus id/google_place_id) from destinations
+PLANNER_COLUMNS = sorted(COLUMN_FIELDS) + ['last_enriched_at']
+
+# Legacy Place Details billing: every call pays the base SKU, plus each data
+# SKU that at least one requested field belongs to. USD per 1000 calls.
+BASE_SKU_COST = 17.0
+SKU_COSTS = {'basic': 0.0, 'contact': 3.0, 'atmosphere': 5.0}
+FIELD_SKUS = {
+    'place_id': 'basic',
+    'name': 'basic',
+    'formatted_address': 'basic',
+    'geometry': 'basic',
+    'plus_code': 'basic',
+    'types': 'basic',
+    'photos': 'basic',
+    'formatted_phone_number': 'contact',
+    'international_phone_number': 'contact',
+    'opening_hours': 'contact',
+    'website': 'contact',
+    'price_level': 'atmosphere',
+    'rating': 'atmosphere',
+    'user_ratings_total': 'atmosphere',
+    'reviews': 'atmosphere',
+    'editorial_summary': 'atmosphere',
+}
+
+# Rough response bytes per field; only used for dry-run estimates
+FIELD_BYTES = {
+    'reviews': 6000,
+    'photos': 2500,
+    'opening_hours': 1200,
+    'geometry': 300,
+    'editorial_summary': 250,
+    'types': 150,
+    'formatted_address': 120,
+    'plus_code': 80,
+    'website': 80,
+}
+DEFAULT_FIELD_BYTES = 40
+RESPONSE_OVERHEAD_BYTES = 100
+
+
+def _is_missing(value) -> bool:
+    return value is None or value == '' or value == [] or value == {}
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def estimate_bytes(fields: Iterable[str]) -> int:
+    return RESPONSE_OVERHEAD_BYTES + sum(FIELD_BYTES.get(f, DEFAULT_FIELD_BYTES) for f in fields)
+
+
+def estimate_cost(fields: Iterable[str]) -> float:
+    """USD for one Place Details call requesting `fields`"""
+    skus = {FIELD_SKUS.get(f, 'basic') for f in fields}
+    return (BASE_SKU_COST + sum(SKU_COSTS[s] for s in skus)) / 1000
+
+
+def needed_columns(dest: Dict, refresh_before: Optional[datetime]) -> List[str]:
+    """
+    Columns of dest worth fetching.
+
+    With refresh_before=None every missing column is needed. Otherwise a
+    destination enriched since refresh_before needs nothing, and an older one
+    needs its missing columns plus all volatile ones.
+    """
+    if refresh_before is None:
+        return [c for c in COLUMN_FIELDS if _is_missing(dest.get(c))]
+
+    enriched_at = _parse_timestamp(dest.get('last_enriched_at'))
+    if enriched_at is not None and enriched_at >= refresh_before:
+        return []
+    return [
+        column for column in COLUMN_FIELDS
+        if column in VOLATILE_COLUMNS or _is_missing(dest.get(column))
+    ]
+
+
+class FieldPlan:
+    """Per-destination field sets, grouped by mask"""
+
+    def __init__(self):
+        self.masks: Dict[FrozenSet[str], List[Dict]] = {}
+        self.by_id: Dict[object, FrozenSet[str]] = {}
+        self.missing = Counter()
+        self.up_to_date = 0
+        self.no_place_id = 0
+
+    def add(self, dest: Dict, columns: List[str]):
+        self.missing.update(columns)
+        if not columns:
+            self.up_to_date += 1
+            return
+        mask = frozenset(COLUMN_FIELDS[c] for c in columns)
+        self.masks.setdefault(mask, []).append(dest)
+        self.by_id[dest['id']] = mask
+
+    def fields_for(self, dest: Dict) -> List[str]:
+        return sorted(self.by_id.get(dest['id'], ()))
+
+    def refreshes_volatile(self, dest: Dict) -> bool:
+        """True if this destination's request covers every volatile column"""
+        mask = self.by_id.get(dest['id'], frozenset())
+        return all(COLUMN_FIELDS[c] in mask for c in VOLATILE_COLUMNS)
+
+    def destinations(self) -> List[Dict]:
+        """Destinations to fetch, grouped so identical masks are contiguous"""
+        return [dest for group in self.masks.values() for dest in group]
+
+    def report(self, baseline_fields: Optional[List[str]] = None) -> Dict:
+        """Calls, bytes and cost of this plan (and of fetching baseline_fields for all)"""
+        groups = []
+        for mask, dests in sorted(self.masks.items(), key=lambda item: -len(item[1])):
+            groups.append({
+                'fields': sorted(mask),
+                'calls': len(dests),
+                'bytes': estimate_bytes(mask) * len(dests),
+                'cost_usd': round(estimate_cost(mask) * len(dests), 2),
+            })
+
+        calls = sum(g['calls'] for g in groups)
+        report = {
+            'calls': calls,
+            'up_to_date': self.up_to_date,
+            'no_place_id': self.no_place_id,
+            'bytes': sum(g['bytes'] for g in groups),
+            'cost_usd': round(sum(g['cost_usd'] for g in groups), 2),
+            'missing_by_column': dict(self.missing.most_common()),
+            'groups': groups,
+        }
+        if baseline_fields:
+            baseline_calls = calls + self.up_to_date
+            report['baseline'] = {
+                'calls': baseline_calls,
+                'bytes': estimate_bytes(baseline_fields) * baseline_calls,
+                'cost_usd': round(estimate_cost(baseline_fields) * baseline_calls, 2),
+            }
+        return report
+
+    def print_report(self, baseline_fields: Optional[List[str]] = None):
+        report = self.report(baseline_fields)
+        print("Field Plan:")
+        print("-"*80)
+        for column, count in report['missing_by_column'].items():
+            print(f"  Needs {column:30} {count:6}")
+        print(f"  Already up to date:                  {report['up_to_date']:6}")
+        print(f"  No Google Place ID:                  {report['no_place_id']:6}")
+        print()
+        for group in report['groups']:
+            print(f"  {group['calls']:6} calls  {group['bytes']/1024:9.1f} KB  ${group['cost_usd']:8.2f}  {','.join(group['fields'])}")
+        print()
+        print(f"  Planned:  {report['calls']:6} calls  {report['bytes']/1024/1024:8.2f} MB  ${report['cost_usd']:.2f}")
+        if 'baseline' in report:
+            base = report['baseline']
+            print(f"  All fields: {base['calls']:4} calls  {base['bytes']/1024/1024:8.2f} MB  ${base['cost_usd']:.2f}")
+        print()
+
+
+def plan_fields(destinations: Iterable[Dict], refresh_days: Optional[float] = 30) -> FieldPlan:
+    """
+    Build a FieldPlan for destinations.
+
+    refresh_days=None never refetches present values; otherwise volatile
+    columns are refetched when last_enriched_at is older than that.
+    """
+    refresh_before = None
+    if refresh_days is not None:
+        refresh_before = datetime.now(timezone.utc) - timedelta(days=refresh_days)
+
+    plan = FieldPlan()
+    for dest in destinations:
+        if not dest.get('google_place_id'):
+            plan.no_place_id += 1
+            continue
+        plan.add(dest, needed_columns(dest, refresh_before))
+    return plan
+
+
+def extract_data_for_update(result):
+    """Extract and format data for Supabase update"""
+    if not result:
+        return None
+
+    update_data = {}
+
+    # Basic fields
+    if 'rating' in result:
+        update_data['rating'] = result['rating']
+
+    if 'user_ratings_total' in result:
+        update_data['user_ratings_total'] = result['user_ratings_total']
+
+    if 'price_level' in result:
+        update_data['price_level'] = result['price_level']
+
+    if 'formatted_address' in result:
+        update_data['formatted_address'] = result['formatted_address']
+
+    if 'formatted_phone_number' in result:
+        update_data['phone_number'] = result['formatted_phone_number']
+
+    if 'international_phone_number' in result:
+        update_data['international_phone_number'] = result['international_phone_number']
+
+    if 'website' in result:
+        update_data['website'] = result['website']
+
+    # Opening hours
+    if 'opening_hours' in result:
+        update_data['opening_hours_json'] = result['opening_hours']
+
+    # Geometry
+    if 'geometry' in result and 'location' in result['geometry']:
+        update_data['latitude'] = result['geometry']['location']['lat']
+        update_data['longitude'] = result['geometry']['location']['lng']
+
+    # Plus code
+    if 'plus_code' in result:
+        update_data['plus_code'] = result['plus_code'].get('global_code')
+
+    # Types
+    if 'types' in result:
+        update_data['tags'] = result['types']
+
+    # Reviews (limit to top 5)
+    if 'reviews' in result:
+        update_data['reviews_json'] = result['reviews'][:5]
+
+    # Editorial summary (Google's AI description)
+    if 'editorial_summary' in result and 'overview' in result['editorial_summary']:
+        update_data['ai_summary'] = result['editorial_summary']['overview']
+
+    return update_data if update_data else None
@@ -0,0 +1,321 @@
+"""
+Adaptive, cross-process rate controller for the external APIs.
+
+Two mechanisms work together:
+
+- A token bucket refilled at `rate` calls/second caps throughput. Its state
+  lives in a local SQLite file, keyed by name ('places', 'gemini',
+  'embeddings'), so two scripts sharing an API key draw from the same
+  bucket instead of each assuming it has the whole quota. A 429 blocks the
+  bucket for Retry-After seconds (or a backoff), for every process.
+- AIMD concurrency decides how many calls this process keeps in flight:
+  each success adds about one slot per window of calls, up to
+  max_concurrency, and a throttle, a timeout or latency drifting well above
+  the fastest seen halves it (at most once per cooldown).
+
+One controller can be shared by threads and by coroutines on any number of
+event loops: the AIMD state is only touched under one lock, and the SQLite
+bucket is called off the event loop. Processes sharing a name should use the
+same rate. State goes to
+.cache/rate_limits.sqlite in the repo root (RATE_STATE_PATH overrides).
+
+Usage:
+    gemini = RateController('gemini', rate=15 / 60, max_concurrency=4)
+
+    with gemini.slot() as call:
+        response = post(...)
+        if response.status_code == 429:
+            call.throttled(response.headers.get('Retry-After'))
+
+    # asyncio
+    async with places.async_slot() as call:
+        ...
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_PATH = os.environ.get(
+    'RATE_STATE_PATH', os.path.join(REPO_ROOT, '.cache', 'rate_limits.sqlite')
+)
+
+DEFAULT_BACKOFF = 5.0          # seconds to block after a 429 without Retry-After
+MAX_BACKOFF = 300.0
+LATENCY_TOLERANCE = 2.0        # back off when smoothed latency exceeds this x the fastest seen
+DECREASE_COOLDOWN = 2.0        # seconds between multiplicative decreases
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    name          TEXT PRIMARY KEY,
+    tokens        REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-After in seconds (the HTTP-date form is rare for these APIs and ignored)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose state is shared by every process using the same file and name"""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None,
+                 path: str = DEFAULT_STATE_PATH):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._db.execute(
+            'INSERT OR IGNORE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+            (name, self.burst, time.time()),
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def try_take(self) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds to wait before retrying."""
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so read-refill-write is atomic across processes
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                tokens, updated_at, blocked_until = self._db.execute(
+                    'SELECT tokens, updated_at, blocked_until FROM rate_buckets WHERE name = ?',
+                    (self.name,),
+                ).fetchone()
+                now = time.time()
+                tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+                if now < blocked_until:
+                    wait = blocked_until - now
+                elif tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                self._db.execute(
+                    'UPDATE rate_buckets SET tokens = ?, updated_at = ? WHERE name = ?',
+                    (tokens, now, self.name),
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return wait
+
+    def block(self, seconds: float):
+        """Stop every process from taking tokens for `seconds`, and drain the bucket"""
+        until = time.time() + seconds
+        with self._lock:
+            self._db.execute(
+                'UPDATE rate_buckets SET tokens = 0, updated_at = ?, '
+                'blocked_until = MAX(blocked_until, ?) WHERE name = ?',
+                (time.time(), until, self.name),
+            )
+
+
+class Call:
+    """Outcome of one call made through a slot; mark throttles and timeouts on it"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.outcome = None
+        self.retry_after: Optional[float] = None
+
+    def throttled(self, retry_after=None):
+        """The API said slow down (HTTP 429, OVER_QUERY_LIMIT, RESOURCE_EXHAUSTED)"""
+        self.outcome = 'throttled'
+        self.retry_after = parse_retry_after(retry_after)
+
+    def timed_out(self):
+        self.outcome = 'timeout'
+
+
+class RateController:
+    """Shared token bucket plus per-process AIMD concurrency"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        path: str = DEFAULT_STATE_PATH,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(name, rate, burst, path)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(initial_concurrency or max(self.min_concurrency, self.max_concurrency // 2))
+        self.in_flight = 0
+        self.calls = 0
+        self.throttles = 0
+        self.backoff = DEFAULT_BACKOFF
+
+        self._min_latency: Optional[float] = None
+        self._avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._state = threading.Lock()
+        self._slots = threading.Condition(self._state)
+        # Coroutines waiting for a slot, with the loop each one runs on
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def close(self):
+        self.bucket.close()
+
+    # -- AIMD ---------------------------------------------------------------
+
+    def _record(self, call: Call):
+        """Adjust the concurrency limit from one finished call. Caller holds _state."""
+        now = time.monotonic()
+        if call.outcome in ('throttled', 'timeout'):
+            if call.outcome == 'throttled':
+                self.throttles += 1
+                wait = call.retry_after if call.retry_after is not None else self.backoff
+                self.bucket.block(min(wait, MAX_BACKOFF))
+                self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+            self._decrease(now)
+            return
+
+        self.backoff = DEFAULT_BACKOFF
+        latency = now - call.started
+        self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+        self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+        if self._avg_latency > LATENCY_TOLERANCE * max(self._min_latency, 0.05):
+            self._decrease(now)
+            # Let the baseline drift up so a permanently slower API doesn't pin concurrency
+            self._min_latency *= 1.1
+        else:
+            # Additive increase: about +1 slot per `limit` successful calls
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _decrease(self, now: float):
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit / 2)
+
+    @property
+    def concurrency(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    # -- threads ------------------------------------------------------------
+
+    def acquire(self):
+        """Block until a concurrency slot and a token are available"""
+        with self._slots:
+            while self.in_flight >= self.concurrency:
+                self._slots.wait()
+            self.in_flight += 1
+        try:
+            while True:
+                wait = self.bucket.try_take()
+                if not wait:
+                    return
+                time.sleep(wait)
+        except BaseException:
+            self._release(None)
+            raise
+
+    def _release(self, call: Optional[Call]):
+        with self._slots:
+            self.in_flight -= 1
+            if call is not None:
+                self.calls += 1
+                self._record(call)
+            self._slots.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        # Waiting coroutines re-check the limit on their own loops
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @contextmanager
+    def slot(self):
+        """One rate-limited call. Exceptions not marked on the Call don't move the limit."""
+        self.acquire()
+        call = Call()
+        try:
+            yield call
+        except BaseException:
+            self._release(call if call.outcome else None)
+            raise
+        self._release(call)
+
+    # -- asyncio ------------------------------------------------------------
+
+    async def acquire_async(self):
+        """Wait for a concurrency slot and a token without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._state:
+                if self.in_flight < self.concurrency:
+                    self.in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+        try:
+            while True:
+                # BEGIN IMMEDIATE can wait on other processes; keep it off the loop
+                wait = await asyncio.to_thread(self.bucket.try_take)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._release(None)
+            raise
+
+    async def _release_async(self, call: Optional[Call]):
+        if call is not None and call.outcome == 'throttled':
+            # Blocking the shared bucket is a SQLite write
+            await asyncio.to_thread(self._release, call)
+        else:
+            self._release(call)
+
+    @asynccontextmanager
+    async def async_slot(self):
+        await self.acquire_async()
+        call = Call()
+        try:
+            yield call
+        except BaseException:
+            await self._release_async(call if call.outcome else None)
+            raise
+        await self._release_async(call)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
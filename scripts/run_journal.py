@@ -0,0 +1,165 @@
+"""
+Append-only checkpoint journal for long enrichment runs.
+
+Every finished destination is appended to a JSON-lines file as soon as its
+outcome is known (ok / failed, with timing and error), and the file is flushed
+after each line. If a run dies at 90%, the journal still holds everything
+that was done:
+
+    --resume         skip destinations whose latest outcome is ok
+    --retry-failed   only process the dead letters: destinations whose
+                     latest outcome is failed
+
+Without either flag a new run starts and the previous journal is archived
+next to it. The latest entry per id always wins, so a resumed run simply
+appends to the same file.
+
+Usage:
+    parser = argparse.ArgumentParser()
+    add_journal_arguments(parser)
+    args = parser.parse_args()
+
+    journal = open_journal('generate_ai_fields', args)
+    for dest in journal.pending(destinations):
+        ...
+        journal.record(dest['id'], 'ok', elapsed=seconds)
+    journal.close()
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOURNAL_DIR = os.environ.get('RUN_JOURNAL_DIR', os.path.join(REPO_ROOT, '.cache', 'runs'))
+
+OK = 'ok'
+FAILED = 'failed'
+
+
+def results_path(filename: str) -> str:
+    """Where a script's result JSON goes: the repo root, wherever it is checked out"""
+    return os.path.join(REPO_ROOT, filename)
+
+
+def add_journal_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--resume', action='store_true',
+                       help="continue the last run, skipping destinations already done")
+    group.add_argument('--retry-failed', action='store_true',
+                       help="only re-run destinations that failed in earlier runs")
+
+
+class RunJournal:
+    """JSON-lines journal of per-destination outcomes"""
+
+    def __init__(self, path: str, mode: str = 'new'):
+        if mode not in ('new', 'resume', 'retry-failed'):
+            raise ValueError(f"unknown journal mode: {mode}")
+        self.path = path
+        self.mode = mode
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        if mode == 'new' and os.path.exists(path):
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(path)))
+            os.replace(path, f"{path[:-len('.jsonl')]}.{stamp}.jsonl")
+
+        self.latest: Dict[str, Dict] = self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline():
+            # Terminate a torn line so the next entry starts cleanly
+            self._file.write('\n')
+        # Writer callbacks may record from worker threads
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        latest = {}
+        if not os.path.exists(self.path):
+            return latest
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a torn last line; everything before it is intact
+                    continue
+                if entry.get('status') in (OK, FAILED):
+                    latest[str(entry['id'])] = entry
+        return latest
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def record(self, dest_id, status: str, elapsed: Optional[float] = None,
+               error: Optional[str] = None, **extra):
+        """Append one outcome. status is 'ok', 'failed', or an informational event."""
+        entry = {'id': dest_id, 'status': status, 'at': time.time()}
+        if elapsed is not None:
+            entry['elapsed'] = round(elapsed, 3)
+        if error:
+            entry['error'] = error
+        entry.update(extra)
+
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if status in (OK, FAILED):
+                self.latest[str(dest_id)] = entry
+
+    def completed_ids(self) -> Set[str]:
+        return {k for k, e in self.latest.items() if e['status'] == OK}
+
+    def failed_ids(self) -> Set[str]:
+        """Dead letters: ids whose latest outcome is a failure"""
+        return {k for k, e in self.latest.items() if e['status'] == FAILED}
+
+    def pending(self, destinations: Iterable[Dict], key: str = 'id') -> List[Dict]:
+        """Filter destinations down to the ones this run should process"""
+        if self.mode == 'resume':
+            done = self.completed_ids()
+            return [d for d in destinations if str(d[key]) not in done]
+        if self.mode == 'retry-failed':
+            failed = self.failed_ids()
+            return [d for d in destinations if str(d[key]) in failed]
+        return list(destinations)
+
+    def summary(self) -> Dict:
+        """Totals over every run recorded in this journal"""
+        failed = self.failed_ids()
+        return {
+            'journal': self.path,
+            'completed': len(self.completed_ids()),
+            'failed': len(failed),
+            'failed_ids': sorted(failed),
+            'failures': {k: self.latest[k].get('error') for k in sorted(failed)},
+        }
+
+
+def open_journal(name: str, args) -> RunJournal:
+    """Open the journal for a script, honouring --resume / --retry-failed"""
+    mode = 'new'
+    if getattr(args, 'resume', False):
+        mode = 'resume'
+    elif getattr(args, 'retry_failed', False):
+        mode = 'retry-failed'
+    journal = RunJournal(os.path.join(JOURNAL_DIR, f"{name}.jsonl"), mode)
+    if mode != 'new':
+        print(f"📒 Journal: {len(journal.completed_ids())} done, {len(journal.failed_ids())} failed ({journal.path})")
+    return journal
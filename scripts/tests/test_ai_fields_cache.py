@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import ai_fields_cache
+from ai_fields_cache import AiFieldsCache, cache_key
+
+INPUTS = {'name': 'Aman Tokyo', 'city': 'tokyo', 'category': 'Hotel', 'description': None}
+FIELDS = {
+    'vibe_tags': ['serene', 'luxurious'],
+    'keywords': ['spa', 'skyline'],
+    'short_summary': 'Minimalist luxury above Otemachi.',
+    'search_keywords': ['aman', 'otemachi'],
+}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_input_order_but_not_content():
+    key = cache_key('gemini-2.5-flash', 'v1', INPUTS)
+    assert key == cache_key('gemini-2.5-flash', 'v1', dict(reversed(list(INPUTS.items()))))
+    assert key != cache_key('gemini-2.5-flash', 'v1', {**INPUTS, 'description': 'Rooftop pool'})
+    assert key != cache_key('gemini-2.5-flash', 'v2', INPUTS)
+    assert key != cache_key('gemini-2.5-pro', 'v1', INPUTS)
+
+
+def test_outputs_survive_a_reopen(tmp_path):
+    path = str(tmp_path / 'ai_fields.sqlite')
+    key = cache_key('gemini-2.5-flash', 'v1', INPUTS)
+    cache = AiFieldsCache(path)
+    assert cache.get(key) is None
+    cache.put(key, FIELDS)
+    cache.close()
+
+    cache = AiFieldsCache(path)
+    assert cache.get(key) == FIELDS
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_fields_cache.time, 'time', clock)
+    cache = AiFieldsCache(str(tmp_path / 'ai_fields.sqlite'))
+    for key in ['a', 'b', 'c']:
+        cache.put(key, FIELDS)
+        clock.now += 1
+    # 'a' is read again, so 'b' is now the least recently used
+    assert cache.get('a') == FIELDS
+    clock.now += 1
+
+    # A fourth entry overflows; trimming to 90% of the budget leaves room for three
+    cache.max_bytes = cache.size_bytes() * 7 // 6
+    cache.put('d', FIELDS)
+
+    assert cache.get('b') is None
+    assert all(cache.get(key) == FIELDS for key in ['a', 'c', 'd'])
+    assert cache.size_bytes() <= cache.max_bytes
+    cache.close()
+
+
+def test_worker_threads_share_one_cache(tmp_path):
+    cache = AiFieldsCache(str(tmp_path / 'ai_fields.sqlite'))
+
+    def round_trip(i):
+        key = cache_key('gemini-2.5-flash', 'v1', {**INPUTS, 'id': i})
+        cache.put(key, {**FIELDS, 'id': i})
+        return cache.get(key)['id']
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert sorted(pool.map(round_trip, range(200))) == list(range(200))
+    assert cache.hits == 200
+    cache.close()
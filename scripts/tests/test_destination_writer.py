@@ -0,0 +1,155 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from destination_writer import BulkWriter, DestinationWriter
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self):
+        return SimpleNamespace(data=self.run())
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows, on_conflict, ignore_duplicates, returning):
+        def run():
+            self.client.requests.append(list(rows))
+            if any(row.get('name') is None for row in rows):
+                raise Exception('null value in column "name"')
+            inserted = [row for row in rows if row[on_conflict] not in self.client.existing]
+            return inserted if returning == 'representation' else []
+        return FakeRequest(run)
+
+
+class FakeSupabase:
+    """bulk_update_destinations and table upserts against an in-memory key set"""
+
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.requests = []
+        self.tables = []
+
+    def rpc(self, name, params):
+        def run():
+            self.requests.append(params['p_rows'])
+            outcomes = []
+            for row in params['p_rows']:
+                key = row.get(params['p_key'])
+                if key is None or len(row) < 2:
+                    status = 'skipped'
+                elif key in self.existing:
+                    status = 'updated'
+                else:
+                    status = 'not_found'
+                outcomes.append({'row_key': None if key is None else str(key), 'status': status, 'error': None})
+            return outcomes
+        return FakeRequest(run)
+
+    def table(self, name):
+        self.tables.append(name)
+        return FakeTable(self)
+
+
+def test_update_accounting():
+    client = FakeSupabase(existing={1, 2})
+    written, skipped = [], []
+    writer = DestinationWriter(client, on_written=written.append,
+                               on_skipped=lambda row, reason: skipped.append((row['id'], reason)))
+    with writer:
+        writer.add({'id': 1, 'tags': ['a']})
+        writer.add({'id': 2, 'tags': ['b']})
+        writer.add({'id': 3, 'tags': ['c']})
+        writer.add({'id': 4})
+
+    assert writer.updated == 2
+    assert [row['id'] for row in written] == [1, 2]
+    assert writer.not_found == ['3']
+    assert skipped == [(3, 'not found'), (4, 'skipped')]
+    assert writer.failures == []
+    assert writer.batches == 1
+
+
+def test_rows_with_the_same_key_are_merged():
+    client = FakeSupabase(existing={1})
+    with DestinationWriter(client) as writer:
+        writer.add({'id': 1, 'tags': ['a']})
+        writer.add({'id': 1, 'rating': 4.5})
+    assert client.requests == [[{'id': 1, 'tags': ['a'], 'rating': 4.5}]]
+
+
+def test_insert_only_upsert_counts_ignored_duplicates():
+    client = FakeSupabase(existing={'kept'})
+    written, skipped = [], []
+    writer = DestinationWriter(client, key='slug', mode='upsert', ignore_duplicates=True,
+                               on_written=written.append,
+                               on_skipped=lambda row, reason: skipped.append((row['slug'], reason)))
+    with writer:
+        writer.add({'slug': 'new', 'name': 'New'})
+        writer.add({'slug': 'kept', 'name': 'Kept'})
+
+    assert writer.updated == 1
+    assert writer.ignored == 1
+    assert [row['slug'] for row in written] == ['new']
+    assert skipped == [('kept', 'duplicate')]
+
+
+def test_rejected_upsert_batch_is_bisected_to_the_bad_row():
+    client = FakeSupabase()
+    failures = []
+    writer = DestinationWriter(client, key='slug', mode='upsert', max_rows=100,
+                               on_failure=lambda row, error: failures.append(row['slug']))
+    with writer:
+        for i in range(8):
+            writer.add({'slug': f"s{i}", 'name': None if i == 5 else f"Name {i}"})
+
+    assert failures == ['s5']
+    assert writer.updated == 7
+    assert [f['key'] for f in writer.failures] == ['s5']
+    # 1 + 2 + 2 + 2 requests: the full batch, then halves down to the bad row
+    assert len(client.requests) == 7
+
+
+def test_rpc_error_fails_the_whole_batch():
+    class Broken(FakeSupabase):
+        def rpc(self, name, params):
+            return FakeRequest(lambda: (_ for _ in ()).throw(Exception('timeout')))
+
+    failures = []
+    with DestinationWriter(Broken(), on_failure=lambda row, error: failures.append((row['id'], error))) as writer:
+        writer.add({'id': 1, 'tags': []})
+        writer.add({'id': 2, 'tags': []})
+    assert failures == [(1, 'timeout'), (2, 'timeout')]
+    assert writer.updated == 0
+
+
+def test_idle_rows_are_flushed_after_max_interval():
+    client = FakeSupabase(existing={1})
+    writer = DestinationWriter(client, max_rows=100, max_interval=0.05)
+    writer.add({'id': 1, 'tags': ['a']})
+    deadline = time.monotonic() + 2
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert writer.pending == 0
+    assert writer.updated == 1
+    writer.close()
+    assert len(client.requests) == 1
+
+
+def test_bulk_writer_targets_its_table():
+    client = FakeSupabase(existing={'tokyo'})
+    with BulkWriter(client, 'cities', key='slug', mode='upsert', ignore_duplicates=True) as writer:
+        writer.add({'slug': 'tokyo', 'name': 'Tokyo'})
+        writer.add({'slug': 'kyoto', 'name': 'Kyoto'})
+    assert client.tables == ['cities']
+    assert (writer.updated, writer.ignored) == (1, 1)
+
+    with pytest.raises(ValueError):
+        BulkWriter(client, 'cities')  # update mode needs an rpc
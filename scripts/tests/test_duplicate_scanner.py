@@ -0,0 +1,58 @@
+from difflib import SequenceMatcher
+from itertools import combinations, product
+
+from duplicate_scanner import BUCKETS, MIN_SIMILARITY, scan_duplicates
+from name_matching import normalize_name
+
+BRANDS = [
+    'Aman', 'Janu', 'Muni', 'Westin', 'Zentis', 'Park Hyatt', 'Hyatt Regency', 'Andaz',
+    'Hotel Okura', 'The Okura', 'Okura Prestige', 'Conrad', 'Cordis', 'Ritz-Carlton',
+    'The Ritz Carlton', 'Four Seasons', 'Four Seasons Marunouchi', 'Sushi Saito', 'Sushi Saitou',
+]
+CITIES = ['tokyo', 'kyoto', 'osaka']
+
+
+def fixture():
+    rows = []
+    for city, brand in product(CITIES, BRANDS):
+        rows.append({'id': len(rows), 'slug': f"s{len(rows)}", 'name': f"{brand} {city.title()}",
+                     'city': city, 'country': 'japan'})
+        rows.append({'id': len(rows), 'slug': f"s{len(rows)}", 'name': brand,
+                     'city': city, 'country': 'japan'})
+    return rows
+
+
+def brute_force(rows):
+    """The all-pairs loop the scanner replaced"""
+    found = {}
+    for city in CITIES:
+        in_city = sorted((r for r in rows if r['city'] == city), key=lambda r: (r['name'], r['id']))
+        for first, second in combinations(in_city, 2):
+            a, b = normalize_name(first['name']), normalize_name(second['name'])
+            score = SequenceMatcher(None, a, b).ratio()
+            if a and b and score >= MIN_SIMILARITY:
+                found[(first['id'], second['id'])] = score
+    return found
+
+
+def test_scan_matches_brute_force():
+    rows = fixture()
+    report = scan_duplicates(rows, workers=1)
+    scanned = {
+        (pair['id1'], pair['id2']): pair['similarity']
+        for bucket in ['exact_matches'] + [b for b, _ in BUCKETS]
+        for pair in report[bucket]
+    }
+    expected = brute_force(rows)
+    assert set(scanned) == set(expected)
+    for key, score in expected.items():
+        assert abs(scanned[key] - score) < 1e-9
+
+
+def test_pairs_sharing_only_the_city_word_are_kept():
+    rows = [
+        {'id': 1, 'name': 'Aman Tokyo', 'city': 'tokyo'},
+        {'id': 2, 'name': 'Janu Tokyo', 'city': 'tokyo'},
+    ]
+    report = scan_duplicates(rows, workers=1)
+    assert [(p['id1'], p['id2']) for p in report['medium_confidence']] == [(1, 2)]
@@ -0,0 +1,43 @@
+from duplicate_clusters import DEFAULT_MIN_SIMILARITY, build_merge_plan, report_pairs
+from name_matching import normalize_name
+from geo_index import CONTAINMENT_CAP, GeoIndex, name_similarity
+
+SUBSET_NAMES = [
+    ("Toranomon Hills", "Andaz Tokyo Toranomon Hills"),
+    ("Park", "Park Hyatt"),
+]
+
+
+def place(id, name, lat=35.6672, lng=139.7497):
+    return {'id': id, 'slug': f"place-{id}", 'name': name, 'city': 'tokyo',
+            'latitude': lat, 'longitude': lng}
+
+
+def test_subset_names_stay_below_cap():
+    for a, b in SUBSET_NAMES:
+        assert name_similarity(normalize_name(a), normalize_name(b)) <= CONTAINMENT_CAP
+
+
+def test_subset_names_at_same_point_are_not_auto_merged():
+    for a, b in SUBSET_NAMES:
+        pairs = GeoIndex([place(1, a), place(2, b)], 150.0).candidate_pairs(0.0)
+        assert len(pairs) == 1
+        assert pairs[0]['similarity'] < DEFAULT_MIN_SIMILARITY
+
+
+def test_identical_names_still_match():
+    assert name_similarity('park hyatt tokyo', 'park hyatt tokyo') == 1.0
+
+
+def test_geo_only_clusters_go_to_review():
+    rows = {1: place(1, "Hotel Toranomon Hills"), 2: place(2, "Toranomon Hills")}
+    geo_pair = {'id1': 1, 'id2': 2, 'similarity': 0.95}
+    pairs = report_pairs({'pairs': [geo_pair]}, DEFAULT_MIN_SIMILARITY)
+
+    plan = build_merge_plan(pairs, rows)
+    assert plan['clusters'] == []
+    assert [entry['reason'] for entry in plan['review']] == ['geo_only']
+
+    name_pair = dict(geo_pair, name1="Hotel Toranomon Hills", name2="Toranomon Hills")
+    plan = build_merge_plan(pairs + report_pairs({'exact_matches': [name_pair]}, 0.9), rows)
+    assert plan['total_clusters'] == 1
@@ -0,0 +1,59 @@
+from itertools import product
+
+from name_matching import NameIndex, normalize_name, similarity
+
+BRANDS = [
+    'Aman', 'Janu', 'Park Hyatt', 'Hyatt Regency', 'Andaz', 'Hotel Okura', 'The Okura',
+    'Okura Prestige', 'Conrad', 'Cordis', 'Ritz-Carlton', 'Four Seasons', 'Sushi Saito',
+    'Sushi Saitou', 'Den', 'Narisawa', 'Florilege', 'Sezanne', 'Blue Bottle', 'Fuglen',
+]
+CITIES = ['tokyo', 'kyoto']
+QUERIES = [
+    'Aman Tokyo', 'Amanemu', 'Park Hyat', 'The Park Hyatt Hotel', 'Okura', 'Ritz Carlton Kyoto',
+    'Four Season', 'Sushi Saito Restaurant', 'Sushisaito', 'Florilège', 'Sézanne', 'Blue-Bottle',
+    'Fuglen Asakusa', 'Conrad & Cordis', 'Narisawa', 'Den', 'Unrelated Bar', 'Ace', '',
+]
+
+
+def catalog():
+    rows = []
+    for city, brand in product(CITIES, BRANDS):
+        rows.append({'id': len(rows), 'name': f"{brand} {city.title()}", 'city': city})
+        rows.append({'id': len(rows), 'name': brand, 'city': city})
+    return rows
+
+
+def exhaustive(rows, title, city, min_score):
+    """The per-row loop NameIndex replaced: first strictly better match wins"""
+    best, best_score = None, 0
+    for row in rows:
+        if row['city'] != city or not normalize_name(row['name']):
+            continue
+        score = similarity(normalize_name(title), normalize_name(row['name']))
+        if score > best_score and score >= min_score:
+            best, best_score = row, score
+    return best, best_score
+
+
+def test_best_match_equals_exhaustive_scan():
+    rows = catalog()
+    index = NameIndex(rows)
+    for title, city, min_score in product(QUERIES, CITIES, [0.0, 0.7, 0.9]):
+        match, score = index.best_match(title, city, min_score)
+        expected, expected_score = exhaustive(rows, title, city, min_score)
+        assert (match and match['id'], score) == (expected and expected['id'], expected_score), title
+
+
+def test_csv_title_is_the_first_sequence():
+    # ratio() is not symmetric, and the two orders pick different winners here
+    rows = [{'id': 1, 'name': 'Don Angie', 'city': 'nyc'}, {'id': 2, 'name': 'Fondazione Prada', 'city': 'nyc'}]
+    title = 'Dolce Tacubo Caffe'
+    assert similarity('don angie', title) > similarity('fondazione prada', title)
+    match, score = NameIndex(rows).best_match(title, 'nyc')
+    assert match['id'] == 2
+    assert score == similarity(normalize_name(title), 'fondazione prada')
+
+
+def test_unknown_city_has_no_match():
+    index = NameIndex(catalog())
+    assert index.best_match('Aman', 'osaka') == (None, 0)
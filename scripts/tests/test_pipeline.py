@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+def stage(name, process=None, **options):
+    options.setdefault('max_wait', 0.01)
+    return Stage(name, process or (lambda batch: {}), **options)
+
+
+def source(count):
+    return ({'id': i} for i in range(count))
+
+
+def run(stages, count):
+    failures = []
+    pipeline = Pipeline(stages, on_failure=lambda name, dest, error: failures.append((name, dest['id'], error)))
+    stats = pipeline.run(source(count), progress_every=None)
+    return pipeline, stats, failures
+
+
+def test_join_sees_each_destination_once_after_both_upstreams():
+    seen = []
+    lock = threading.Lock()
+
+    def tag(key):
+        def process(batch):
+            for dest in batch:
+                dest[key] = True
+            return {}
+        return process
+
+    def join(batch):
+        with lock:
+            seen.extend((dest['id'], dest.get('x'), dest.get('y')) for dest in batch)
+
+    pipeline, stats, failures = run([
+        stage('x', tag('x'), batch_size=3),
+        stage('y', tag('y'), batch_size=7, concurrency=2),
+        stage('j', join, after=('x', 'y'), batch_size=10),
+    ], 40)
+    assert sorted(seen) == [(i, True, True) for i in range(40)]
+    assert stats['j']['processed'] == 40 and not failures
+    assert not pipeline.runners['j']._arrivals
+
+
+def test_failure_on_one_branch_blocks_the_join():
+    def fail_odd(batch):
+        return {dest['id']: 'odd' for dest in batch if dest['id'] % 2}
+
+    _, stats, failures = run([
+        stage('x', fail_odd, batch_size=4),
+        stage('y', batch_size=4),
+        stage('j', after=('x', 'y'), batch_size=4),
+        stage('k', after=('j',), batch_size=4),
+    ], 20)
+    assert sorted(dest_id for _, dest_id, _ in failures) == list(range(1, 20, 2))
+    assert (stats['j']['processed'], stats['j']['blocked']) == (10, 10)
+    assert (stats['k']['received'], stats['k']['blocked']) == (20, 10)
+
+
+def test_stage_with_every_worker_crashed_drains_its_inbox():
+    def crash(dest):
+        raise RuntimeError('boom')
+
+    _, stats, failures = run([
+        stage('a', batch_size=5, queue_size=5),
+        stage('b', after=('a',), concurrency=2, batch_size=5, queue_size=5, wants=crash),
+        stage('c', after=('b',), batch_size=5),
+    ], 200)
+    assert stats['b']['crashed_workers'] == 2
+    assert stats['b']['received'] == 200 and stats['b']['failed'] == 200
+    # The two crashed batches are only reported; everything drained flows on blocked
+    assert 190 <= stats['c']['received'] < 200
+    assert stats['c']['blocked'] == stats['c']['received']
+    assert len(failures) == 200
+
+
+def test_join_settles_when_an_upstream_worker_crashes():
+    def crash_on_seven(dest):
+        if dest['id'] == 7:
+            raise RuntimeError('boom')
+        return True
+
+    pipeline, stats, failures = run([
+        stage('x', batch_size=1, wants=crash_on_seven),
+        stage('y', batch_size=1, concurrency=2),
+        stage('j', after=('x', 'y'), batch_size=10),
+    ], 30)
+    assert stats['x']['crashed_workers'] == 1
+    assert stats['j']['received'] == 30
+    assert stats['j']['processed'] + stats['j']['blocked'] == 30
+    assert ('x', 7, 'worker crashed: RuntimeError: boom') in failures
+    assert not pipeline.runners['j']._arrivals
+
+
+def test_source_errors_are_raised_after_the_run_settles():
+    def broken():
+        yield {'id': 1}
+        raise ValueError('page failed')
+
+    pipeline = Pipeline([stage('a')])
+    with pytest.raises(ValueError, match='page failed'):
+        pipeline.run(broken(), progress_every=None)
+    assert pipeline.stats()['a']['processed'] == 1
+
+
+def test_cycles_and_unknown_upstreams_are_rejected():
+    with pytest.raises(ValueError, match='cycle'):
+        Pipeline([stage('a', after=('b',)), stage('b', after=('a',))])
+    with pytest.raises(ValueError, match='unknown'):
+        Pipeline([stage('a', after=('missing',))])
@@ -0,0 +1,75 @@
+import places_cache
+from places_cache import PlacesCache, covers
+
+RESULT = {
+    'types': ['restaurant', 'food'],
+    'geometry': {'location': {'lat': 35.66, 'lng': 139.74}},
+    'rating': 4.6,
+}
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def cache(tmp_path, monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr(places_cache.time, 'time', clock)
+    return PlacesCache(str(tmp_path / 'places.sqlite'), **options), clock
+
+
+def test_covers_accepts_subsets_and_parent_objects():
+    assert covers(['types', 'geometry', 'rating'], ['types'])
+    assert covers(['geometry'], ['geometry/location'])
+    assert not covers(['types'], ['types', 'rating'])
+    assert not covers(['geometry/location'], ['geometry'])
+
+
+def test_subset_request_is_answered_from_full_entry(tmp_path, monkeypatch):
+    store, _ = cache(tmp_path, monkeypatch)
+    store.put('p1', ['types', 'geometry', 'rating'], RESULT)
+    assert store.get('p1', ['types']) == {'types': RESULT['types']}
+    assert store.get('p1', ['geometry/location']) == {'geometry': RESULT['geometry']}
+    assert store.get('p1', ['types', 'website']) is None
+    assert (store.hits, store.misses) == (2, 1)
+
+
+def test_puts_for_other_fields_are_merged(tmp_path, monkeypatch):
+    store, _ = cache(tmp_path, monkeypatch)
+    store.put('p1', ['types'], {'types': RESULT['types']})
+    store.put('p1', ['rating'], {'rating': RESULT['rating']})
+    assert store.get('p1', ['types', 'rating']) == {'types': RESULT['types'], 'rating': 4.6}
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    store, clock = cache(tmp_path, monkeypatch, ttl=60)
+    store.put('p1', ['types'], RESULT)
+    clock.now += 59
+    assert store.get('p1', ['types']) is not None
+    clock.now += 2
+    assert store.get('p1', ['types']) is None
+    assert store.purge_expired() == 1
+    assert store.size_bytes() == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    store, clock = cache(tmp_path, monkeypatch)
+    payload = {'types': ['x' * 100]}
+    for place_id in ['a', 'b', 'c']:
+        store.put(place_id, ['types'], payload)
+        clock.now += 1
+    # 'a' is read again, so 'b' is now the least recently used
+    assert store.get('a', ['types']) is not None
+    clock.now += 1
+
+    # A fourth entry overflows; trimming to 90% of the budget leaves room for three
+    store.max_bytes = store.size_bytes() * 7 // 6
+    store.put('d', ['types'], payload)
+
+    assert store.get('b', ['types']) is None
+    assert all(store.get(place_id, ['types']) for place_id in ['a', 'c', 'd'])
+    assert store.size_bytes() <= store.max_bytes
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from rate_controller import RateController
+
+
+def test_threads_and_event_loops_share_the_limit(tmp_path):
+    controller = RateController('test', rate=10_000, burst=10_000, max_concurrency=3,
+                                initial_concurrency=3, path=str(tmp_path / 'rate.sqlite'))
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def enter():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+
+    def leave():
+        with lock:
+            active[0] -= 1
+
+    def thread_user():
+        for _ in range(20):
+            with controller.slot():
+                enter()
+                time.sleep(0.001)
+                leave()
+
+    async def one_call():
+        async with controller.async_slot():
+            enter()
+            await asyncio.sleep(0.001)
+            leave()
+
+    def loop_user():
+        async def run():
+            await asyncio.gather(*(one_call() for _ in range(20)))
+        asyncio.run(run())
+
+    threads = [threading.Thread(target=f) for f in (thread_user, thread_user, loop_user, loop_user)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert controller.in_flight == 0
+    assert controller.calls == 80
+    assert 1 <= peak[0] <= controller.max_concurrency
+    controller.close()
+
+
+def test_throttle_blocks_the_shared_bucket(tmp_path):
+    path = str(tmp_path / 'rate.sqlite')
+    controller = RateController('test', rate=1000, path=path)
+
+    async def throttled_call():
+        async with controller.async_slot() as call:
+            call.throttled('30')
+
+    asyncio.run(throttled_call())
+    assert controller.throttles == 1
+    # Another controller on the same file sees the block
+    other = RateController('test', rate=1000, path=path)
+    assert other.bucket.try_take() > 25
+    other.close()
+    controller.close()
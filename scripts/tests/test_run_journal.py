@@ -0,0 +1,72 @@
+import argparse
+import os
+
+import pytest
+
+import run_journal
+from run_journal import RunJournal, add_journal_arguments, open_journal
+
+DESTINATIONS = [{'id': i, 'slug': f"d{i}"} for i in range(1, 6)]
+
+
+def open_with(flags, tmp_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'JOURNAL_DIR', str(tmp_path))
+    parser = argparse.ArgumentParser()
+    add_journal_arguments(parser)
+    return open_journal('enrich', parser.parse_args(flags))
+
+
+def first_run(tmp_path, monkeypatch):
+    """1 and 2 done, 3 failed, then the run dies before 4 and 5"""
+    with open_with([], tmp_path, monkeypatch) as journal:
+        journal.record(1, 'ok', elapsed=0.5)
+        journal.record(2, 'ok')
+        journal.record(3, 'failed', error='timeout')
+        journal.record(4, 'retrying')
+
+
+def ids(destinations):
+    return [d['id'] for d in destinations]
+
+
+def test_resume_skips_completed(tmp_path, monkeypatch):
+    first_run(tmp_path, monkeypatch)
+    with open_with(['--resume'], tmp_path, monkeypatch) as journal:
+        assert ids(journal.pending(DESTINATIONS)) == [3, 4, 5]
+
+
+def test_retry_failed_only_replays_dead_letters(tmp_path, monkeypatch):
+    first_run(tmp_path, monkeypatch)
+    with open_with(['--retry-failed'], tmp_path, monkeypatch) as journal:
+        assert ids(journal.pending(DESTINATIONS)) == [3]
+        journal.record(3, 'ok')
+        assert journal.summary()['failed'] == 0
+    with open_with(['--retry-failed'], tmp_path, monkeypatch) as journal:
+        assert journal.pending(DESTINATIONS) == []
+
+
+def test_latest_outcome_wins_and_survives_a_torn_line(tmp_path, monkeypatch):
+    first_run(tmp_path, monkeypatch)
+    path = os.path.join(str(tmp_path), 'enrich.jsonl')
+    with open(path, 'a') as f:
+        f.write('{"id": 5, "status": "o')
+    with open_with(['--resume'], tmp_path, monkeypatch) as journal:
+        journal.record(2, 'failed', error='update failed')
+        summary = journal.summary()
+    assert (summary['completed'], summary['failed_ids']) == (1, ['2', '3'])
+    assert summary['failures'] == {'2': 'update failed', '3': 'timeout'}
+    with RunJournal(path, 'resume') as reopened:
+        assert reopened.completed_ids() == {'1'}
+
+
+def test_new_run_archives_previous_journal(tmp_path, monkeypatch):
+    first_run(tmp_path, monkeypatch)
+    with open_with([], tmp_path, monkeypatch) as journal:
+        assert ids(journal.pending(DESTINATIONS)) == [1, 2, 3, 4, 5]
+        assert journal.summary()['completed'] == 0
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_flags_are_mutually_exclusive(tmp_path, monkeypatch):
+    with pytest.raises(SystemExit):
+        open_with(['--resume', '--retry-failed'], tmp_path, monkeypatch)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped local copy of the destination embeddings, with top-k search.
+
+`export_index()` streams every embedding out of Supabase into a directory:
+
+    embeddings.f32      n x dim float32 matrix, rows L2-normalised, little-endian
+    ids.npy             destination id per row
+    city.npy            city code per row (index into meta.json "cities", -1 = none)
+    category.npy        category code per row (index into "categories", -1 = none)
+    michelin_stars.npy  int16, -1 = none
+    rating.npy          float32, NaN = none
+    price_level.npy     int16, -1 = none
+    meta.json           dim, count, model, city/category vocabularies, slugs
+
+`VectorIndex` maps those files read-only, so opening it costs a JSON parse and
+a few mmap calls, and every process searching the same index shares one copy
+of the matrix through the page cache. `search()` applies the same filters and
+threshold as the match_destinations RPC (migrations/007) and ranks by cosine
+similarity, so results can be compared with the database offline.
+
+Usage:
+    python vector_index.py export [--path DIR]
+    python vector_index.py search <slug> [--city Tokyo] [--k 10]
+    python vector_index.py bench [--queries 200]
+
+    index = VectorIndex.open()
+    for hit in index.search(query_embedding, k=10, city='Tokyo'):
+        print(hit['slug'], hit['similarity'])
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from clients import get_supabase
+from destination_reader import iter_destinations_parallel
+
+if TYPE_CHECKING:
+    import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX_PATH = os.environ.get(
+    'VECTOR_INDEX_PATH', os.path.join(REPO_ROOT, '.cache', 'vector_index')
+)
+EMBEDDING_DIM = 768
+
+# Defaults of match_destinations()
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_MATCH_COUNT = 50
+
+MATRIX_FILE = 'embeddings.f32'
+META_FILE = 'meta.json'
+INT_NONE = -1
+
+
+def _parse_embedding(value) -> Optional['np.ndarray']:
+    """PostgREST returns vector columns as text: '[0.1,0.2,...]'"""
+    import numpy as np
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype='<f4')
+
+
+def _code(vocab: Dict[str, int], names: List[str], value: Optional[str]) -> int:
+    """
+    Vocabulary code keyed case-insensitively, matching the RPC's
+    LOWER(...) = LOWER(...); names keeps the first spelling seen for display.
+    """
+    if not value:
+        return INT_NONE
+    key = value.lower()
+    if key not in vocab:
+        vocab[key] = len(names)
+        names.append(value)
+    return vocab[key]
+
+
+def export_index(supabase, path: str = DEFAULT_INDEX_PATH, workers: int = 4) -> Dict:
+    """
+    Write every destination embedding to `path`, replacing any previous export.
+
+    The export is built next to `path` and swapped in at the end, so readers
+    never see a half-written index.
+    """
+    import numpy as np
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    ids, slugs, michelin, rating, price = [], [], [], [], []
+    city_codes, category_codes = [], []
+    cities: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    city_names: List[str] = []
+    category_names: List[str] = []
+    model = None
+
+    # Rows are appended to the matrix file as they stream in, so memory
+    # holds the small columns only
+    with open(os.path.join(tmp_path, MATRIX_FILE), 'wb') as matrix:
+        rows = iter_destinations_parallel(
+            supabase,
+            'id, slug, city, category, michelin_stars, rating, price_level, embedding, embedding_model',
+            workers=workers,
+            page_size=500,
+            filters=lambda q: q.not_.is_('embedding', 'null'),
+        )
+        for row in rows:
+            vector = _parse_embedding(row.get('embedding'))
+            if vector is None or vector.shape != (EMBEDDING_DIM,):
+                continue
+            norm = np.linalg.norm(vector)
+            if not norm:
+                continue
+            matrix.write((vector / norm).astype('<f4').tobytes())
+
+            ids.append(row['id'])
+            slugs.append(row.get('slug'))
+            city_codes.append(_code(cities, city_names, row.get('city')))
+            category_codes.append(_code(categories, category_names, row.get('category')))
+            michelin.append(INT_NONE if row.get('michelin_stars') is None else row['michelin_stars'])
+            rating.append(np.nan if row.get('rating') is None else row['rating'])
+            price.append(INT_NONE if row.get('price_level') is None else row['price_level'])
+            model = model or row.get('embedding_model')
+
+    np.save(os.path.join(tmp_path, 'ids.npy'), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(tmp_path, 'city.npy'), np.asarray(city_codes, dtype=np.int32))
+    np.save(os.path.join(tmp_path, 'category.npy'), np.asarray(category_codes, dtype=np.int32))
+    np.save(os.path.join(tmp_path, 'michelin_stars.npy'), np.asarray(michelin, dtype=np.int16))
+    np.save(os.path.join(tmp_path, 'rating.npy'), np.asarray(rating, dtype=np.float32))
+    np.save(os.path.join(tmp_path, 'price_level.npy'), np.asarray(price, dtype=np.int16))
+
+    meta = {
+        'dim': EMBEDDING_DIM,
+        'count': len(ids),
+        'model': model,
+        'exported_at': datetime.now(timezone.utc).isoformat(),
+        'cities': city_names,
+        'categories': category_names,
+        'slugs': slugs,
+    }
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return {k: v for k, v in meta.items() if k != 'slugs'}
+
+
+class VectorIndex:
+    """Read-only, memory-mapped embedding matrix plus filter columns"""
+
+    def __init__(self, path: str, meta: Dict):
+        import numpy as np
+        self.path = path
+        self.meta = meta
+        self.dim = meta['dim']
+        self.count = meta['count']
+        self.slugs: List[str] = meta['slugs']
+        self.cities = {name.lower(): code for code, name in enumerate(meta['cities'])}
+        self.categories = {name.lower(): code for code, name in enumerate(meta['categories'])}
+
+        if self.count:
+            self.matrix = np.memmap(
+                os.path.join(path, MATRIX_FILE), dtype='<f4', mode='r', shape=(self.count, self.dim)
+            )
+        else:
+            self.matrix = np.zeros((0, self.dim), dtype='<f4')
+
+        def column(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+
+        self.ids = column('ids')
+        self.city = column('city')
+        self.category = column('category')
+        self.michelin_stars = column('michelin_stars')
+        self.rating = column('rating')
+        self.price_level = column('price_level')
+        self._row_by_slug = None
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_INDEX_PATH) -> 'VectorIndex':
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            return cls(path, json.load(f))
+
+    def row_for_slug(self, slug: str) -> Optional[int]:
+        if self._row_by_slug is None:
+            self._row_by_slug = {s: i for i, s in enumerate(self.slugs)}
+        return self._row_by_slug.get(slug)
+
+    def vector(self, row: int) -> 'np.ndarray':
+        import numpy as np
+        return np.asarray(self.matrix[row])
+
+    def candidates(
+        self,
+        city: Optional[str] = None,
+        category: Optional[str] = None,
+        michelin_stars: Optional[int] = None,
+        min_rating: Optional[float] = None,
+        max_price_level: Optional[int] = None,
+    ) -> Optional['np.ndarray']:
+        """Row numbers passing the filters, or None when nothing is filtered"""
+        import numpy as np
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if city is not None:
+            narrow(self.city == self.cities.get(city.lower(), -2))
+        if category is not None:
+            narrow(self.category == self.categories.get(category.lower(), -2))
+        if michelin_stars is not None:
+            narrow(self.michelin_stars == michelin_stars)
+        if min_rating is not None:
+            # NaN (no rating) compares False, like NULL >= x in SQL
+            narrow(self.rating >= min_rating)
+        if max_price_level is not None:
+            narrow((self.price_level != INT_NONE) & (self.price_level <= max_price_level))
+        return None if mask is None else np.flatnonzero(mask)
+
+    def search(
+        self,
+        query_embedding,
+        k: int = DEFAULT_MATCH_COUNT,
+        threshold: float = DEFAULT_THRESHOLD,
+        city: Optional[str] = None,
+        category: Optional[str] = None,
+        michelin_stars: Optional[int] = None,
+        min_rating: Optional[float] = None,
+        max_price_level: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Top-k destinations by cosine similarity, same semantics as match_destinations():
+        similarity > threshold, case-insensitive city/category, exact michelin_stars.
+        """
+        import numpy as np
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm or not self.count:
+            return []
+        query = query / norm
+
+        rows = self.candidates(city, category, michelin_stars, min_rating, max_price_level)
+        if rows is None:
+            scores = self.matrix @ query
+            rows = np.arange(self.count)
+        elif not len(rows):
+            return []
+        else:
+            scores = self.matrix[rows] @ query
+
+        keep = scores > threshold
+        rows, scores = rows[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+
+        return [
+            {
+                'id': int(self.ids[r]),
+                'slug': self.slugs[r],
+                'city': self.meta['cities'][self.city[r]] if self.city[r] != INT_NONE else None,
+                'category': self.meta['categories'][self.category[r]] if self.category[r] != INT_NONE else None,
+                'similarity': float(s),
+            }
+            for r, s in zip(rows[order], scores[order])
+        ]
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local memory-mapped destination vector index")
+    parser.add_argument('--path', default=DEFAULT_INDEX_PATH, help="index directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('export', help="export embeddings from Supabase")
+
+    search = commands.add_parser('search', help="destinations most similar to one destination")
+    search.add_argument('slug')
+    search.add_argument('--k', type=int, default=10)
+    search.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    search.add_argument('--city')
+    search.add_argument('--category')
+    search.add_argument('--michelin-stars', type=int)
+    search.add_argument('--min-rating', type=float)
+    search.add_argument('--max-price-level', type=int)
+
+    bench = commands.add_parser('bench', help="time searches using stored embeddings as queries")
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('--k', type=int, default=DEFAULT_MATCH_COUNT)
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print("📤 Exporting embeddings...")
+        started = time.time()
+        meta = export_index(get_supabase(), args.path)
+        size = meta['count'] * meta['dim'] * 4
+        print(f"✅ {meta['count']} embeddings ({size/1024/1024:.1f} MB) -> {args.path} in {time.time() - started:.1f}s")
+        return
+
+    started = time.perf_counter()
+    index = VectorIndex.open(args.path)
+    print(f"📂 Opened {index.count} embeddings in {(time.perf_counter() - started)*1000:.1f} ms")
+
+    if args.command == 'search':
+        row = index.row_for_slug(args.slug)
+        if row is None:
+            print(f"❌ {args.slug} is not in the index")
+            sys.exit(1)
+        hits = index.search(
+            index.vector(row), k=args.k, threshold=args.threshold,
+            city=args.city, category=args.category, michelin_stars=args.michelin_stars,
+            min_rating=args.min_rating, max_price_level=args.max_price_level,
+        )
+        for hit in hits:
+            print(f"  {hit['similarity']:.4f}  {hit['slug']:50} {hit['city'] or '':20} {hit['category'] or ''}")
+        return
+
+    if args.command == 'bench':
+        import numpy as np
+        if not index.count:
+            print("❌ Index is empty")
+            sys.exit(1)
+        rng = np.random.default_rng(0)
+        rows = rng.choice(index.count, size=min(args.queries, index.count), replace=False)
+        timings = []
+        for row in rows:
+            query = index.vector(row)
+            started = time.perf_counter()
+            index.search(query, k=args.k, threshold=-1.0)
+            timings.append(time.perf_counter() - started)
+        timings = np.asarray(timings) * 1000
+        print(f"⏱️  {len(timings)} queries, k={args.k}: "
+              f"p50 {np.percentile(timings, 50):.2f} ms, p95 {np.percentile(timings, 95):.2f} ms, "
+              f"max {timings.max():.2f} ms")
+
+
+if __name__ == '__main__':
+    main()